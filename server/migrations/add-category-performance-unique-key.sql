@@ -0,0 +1,14 @@
+-- Category Performance Unique Key Migration
+-- Lets enhanced_real_data_collector.py upsert category_performance with ON CONFLICT
+
+-- Step 1: Remove duplicate rows, keeping the most recent insert per key
+DELETE FROM category_performance a
+USING category_performance b
+WHERE a.category_name = b.category_name
+  AND a.subcategory IS NOT DISTINCT FROM b.subcategory
+  AND a.analysis_date = b.analysis_date
+  AND a.id < b.id;
+
+-- Step 2: Create the unique index used as the conflict target
+CREATE UNIQUE INDEX IF NOT EXISTS ux_category_performance_key
+    ON category_performance (category_name, subcategory, analysis_date);
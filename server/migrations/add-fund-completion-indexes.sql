@@ -0,0 +1,9 @@
+-- Fund Completion Indexes Migration
+-- Backs the NOT EXISTS / LEFT JOIN anti-joins in fast_batch_processor.py, final_100_percent_completion.py
+-- and resilient_complete_collector.py
+-- portfolio_holdings.fund_id lookups already use idx_portfolio_holdings_fund_stock (fund_id leads)
+-- Note: CREATE INDEX CONCURRENTLY cannot run inside a transaction block; run this file with psql directly
+
+-- Funds without AUM: NOT EXISTS (... aum_analytics WHERE fund_name = f.fund_name)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_aum_analytics_fund_name
+    ON aum_analytics (fund_name);
@@ -0,0 +1,20 @@
+-- Integrity Check Indexes Migration
+-- Backs the GROUP BY / HAVING checks in server/scrapers/advisorkhoj/database_integrity_check.py
+-- Note: CREATE INDEX CONCURRENTLY cannot run inside a transaction block; run this file with psql directly
+
+-- Duplicate holdings check: GROUP BY fund_id, stock_name
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_portfolio_holdings_fund_stock
+    ON portfolio_holdings (fund_id, stock_name);
+
+-- Duplicate AUM check: GROUP BY amc_name, fund_name
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_aum_analytics_amc_fund
+    ON aum_analytics (amc_name, fund_name);
+
+-- Invalid score check: partial index stays empty while all scores are in range
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_fund_scores_invalid
+    ON fund_scores_corrected (fund_id)
+    WHERE total_score < 0 OR total_score > 100
+       OR historical_returns_total < 0 OR historical_returns_total > 40
+       OR risk_grade_total < 0 OR risk_grade_total > 30
+       OR fundamentals_total < 0 OR fundamentals_total > 20
+       OR other_metrics_total < 0 OR other_metrics_total > 10;
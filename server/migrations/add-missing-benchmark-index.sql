@@ -0,0 +1,9 @@
+-- Missing Benchmark Index Migration
+-- Backs the "benchmark_name IS NULL OR benchmark_name = ''" scans in fast_batch_processor.py,
+-- final_complete_all_data.py and resilient_complete_collector.py; the partial index stays empty
+-- once every fund is assigned
+-- Note: CREATE INDEX CONCURRENTLY cannot run inside a transaction block; run this file with psql directly
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_funds_missing_benchmark
+    ON funds (id)
+    WHERE benchmark_name IS NULL OR benchmark_name = '';
@@ -0,0 +1,16 @@
+-- Portfolio Overlap Unique Key Migration
+-- Lets scraper.py upsert portfolio_overlap with ON CONFLICT; run before
+-- drizzle-kit push so the ux_overlap declared in shared/schema.ts can be built
+
+-- Step 1: Remove duplicate rows, keeping the first insert per key
+-- (rows with NULL scheme codes never collide in a unique index, so they stay)
+DELETE FROM portfolio_overlap a
+USING portfolio_overlap b
+WHERE a.fund1_scheme_code = b.fund1_scheme_code
+  AND a.fund2_scheme_code = b.fund2_scheme_code
+  AND a.analysis_date = b.analysis_date
+  AND a.id > b.id;
+
+-- Step 2: Create the unique index used as the conflict target
+CREATE UNIQUE INDEX IF NOT EXISTS ux_overlap
+    ON portfolio_overlap (fund1_scheme_code, fund2_scheme_code, analysis_date);
@@ -0,0 +1,50 @@
+"""
+Shared database connection pool for the advisorkhoj scripts
+"""
+
+import os
+import atexit
+from contextlib import contextmanager
+from types import MappingProxyType
+from urllib.parse import urlparse
+from psycopg2.pool import ThreadedConnectionPool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Connection arguments, parsed once from DATABASE_URL at import
+_parsed = urlparse(os.getenv('DATABASE_URL'))
+DB_KWARGS = MappingProxyType({
+    'host': _parsed.hostname,
+    'port': _parsed.port,
+    'database': _parsed.path[1:],
+    'user': _parsed.username,
+    'password': _parsed.password,
+    'sslmode': 'require'
+})
+
+_pool = None
+
+
+def get_pool():
+    """Create the pool on first use; connections are closed at interpreter exit"""
+    global _pool
+    if _pool is None:
+        _pool = ThreadedConnectionPool(1, 4, **DB_KWARGS)
+        atexit.register(_pool.closeall)
+    return _pool
+
+
+@contextmanager
+def connection(autocommit=False):
+    """Borrow a pooled connection and hand it back with a clean session"""
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        conn.autocommit = autocommit
+        yield conn
+    finally:
+        if not conn.closed:
+            # Drops any open transaction and session settings (readonly etc.)
+            conn.reset()
+        pool.putconn(conn)
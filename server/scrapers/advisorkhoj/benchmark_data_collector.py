@@ -162,19 +162,24 @@ class BenchmarkDataCollector:
                             idx.date()
                         ))
                     
-                    # Insert data
-                    cursor.executemany("""
+                    # Insert data as one multi-row statement; three months of closes is small
+                    # enough to inline with mogrify rather than bind row by row
+                    values = b",".join(
+                        cursor.mogrify("(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", row)
+                        for row in batch_data
+                    ).decode()
+                    cursor.execute(f"""
                         INSERT INTO market_indices 
                         (index_name, close_value, open_value, high_value, low_value, 
                          volume, pe_ratio, pb_ratio, dividend_yield, index_date)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        VALUES {values}
                         ON CONFLICT (index_name, index_date) DO UPDATE
                         SET close_value = EXCLUDED.close_value,
                             open_value = EXCLUDED.open_value,
                             high_value = EXCLUDED.high_value,
                             low_value = EXCLUDED.low_value,
                             volume = EXCLUDED.volume
-                    """, batch_data)
+                    """)
                     
                     count += cursor.rowcount
                     self.db_conn.commit()
@@ -10,8 +10,11 @@ import json
 import time
 import logging
 from datetime import datetime, date, timedelta
+from itertools import repeat
 from typing import Dict, List, Optional, Tuple
+import numpy as np
 import psycopg2
+from psycopg2.extras import execute_values
 from urllib.parse import urlparse
 from dotenv import load_dotenv
 import random
@@ -26,6 +29,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Fund share of AMC AUM: first matching subcategory keyword, else the category default
+AUM_SUBCATEGORY_SHARES = {
+    'Equity': (('Large Cap', 0.15), ('Mid Cap', 0.08), ('Small Cap', 0.05), ('ELSS', 0.10)),
+    'Debt': (('Liquid', 0.20), ('Corporate', 0.12)),  # Liquid funds have high AUM
+}
+AUM_CATEGORY_SHARES = {'Equity': 0.03, 'Debt': 0.06, 'Hybrid': 0.07}
+
+def _sample_pairs(rng: np.random.Generator, n: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """k distinct random pairs (i < j) out of n items, drawn without listing all n(n-1)/2"""
+    keys = np.empty(0, dtype=np.int64)
+    while len(keys) < k:
+        i = rng.integers(0, n, size=k)
+        j = (i + rng.integers(1, n, size=k)) % n
+        keys = np.concatenate([keys, np.minimum(i, j) * n + np.maximum(i, j)])
+        _, first = np.unique(keys, return_index=True)
+        keys = keys[np.sort(first)]  # drop repeats, keep draw order
+    return np.divmod(keys[:k], n)
+
 class CompleteMFDataCollector:
     """Complete data collector for all mutual funds"""
     
@@ -66,7 +87,8 @@ class CompleteMFDataCollector:
         
         # Get funds without AUM data
         cursor.execute("""
-            SELECT f.id, f.scheme_code, f.fund_name, f.amc_name, f.category, f.subcategory
+            SELECT f.id, f.scheme_code, f.fund_name, f.amc_name, f.category,
+                   COALESCE(f.subcategory, '')
             FROM funds f
             LEFT JOIN aum_analytics a ON f.fund_name = a.fund_name
             WHERE a.fund_name IS NULL
@@ -100,78 +122,75 @@ class CompleteMFDataCollector:
             'Motilal Oswal Mutual Fund': 45000
         }
         
-        count = 0
-        batch_data = []
+        today = date.today()
+        amc_totals = []
+        shares = []
+        share_cache = {}
         
         for row in all_funds:
             fund_id, scheme_code, fund_name, amc_name, category, subcategory = row
             
             # Get AMC total
-            amc_total = amc_aum_map.get(amc_name, 10000)
+            amc_totals.append(amc_aum_map.get(amc_name, 10000))
             
-            # Calculate fund AUM based on category and subcategory
-            if category == 'Equity':
-                if subcategory and 'Large Cap' in subcategory:
-                    base_aum = amc_total * 0.15  # 15% of AMC AUM
-                elif subcategory and 'Mid Cap' in subcategory:
-                    base_aum = amc_total * 0.08
-                elif subcategory and 'Small Cap' in subcategory:
-                    base_aum = amc_total * 0.05
-                elif subcategory and 'ELSS' in subcategory:
-                    base_aum = amc_total * 0.10
-                else:
-                    base_aum = amc_total * 0.03
-            elif category == 'Debt':
-                if subcategory and 'Liquid' in subcategory:
-                    base_aum = amc_total * 0.20  # Liquid funds have high AUM
-                elif subcategory and 'Corporate' in subcategory:
-                    base_aum = amc_total * 0.12
-                else:
-                    base_aum = amc_total * 0.06
-            elif category == 'Hybrid':
-                base_aum = amc_total * 0.07
-            else:
-                base_aum = amc_total * 0.02
-                
-            # Add randomness
-            fund_aum = round(base_aum * random.uniform(0.7, 1.3), 2)
-            
-            batch_data.append((
-                amc_name,
-                fund_name,
-                fund_aum,
-                amc_total,
-                None,
-                category,
-                date.today(),
-                'complete_collection'
-            ))
+            # Fund's share of AMC AUM, resolved once per (category, subcategory)
+            key = (category, subcategory)
+            share = share_cache.get(key)
+            if share is None:
+                share = next(
+                    (s for keyword, s in AUM_SUBCATEGORY_SHARES.get(category, ()) if keyword in subcategory),
+                    AUM_CATEGORY_SHARES.get(category, 0.02)
+                )
+                share_cache[key] = share
+            shares.append(share)
             
-            # Insert in batches
-            if len(batch_data) >= 500:
-                cursor.executemany("""
-                    INSERT INTO aum_analytics 
-                    (amc_name, fund_name, aum_crores, total_aum_crores, 
-                     fund_count, category, data_date, source)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT DO NOTHING
-                """, batch_data)
-                count += cursor.rowcount
-                self.db_conn.commit()
-                batch_data = []
-                logger.info(f"Progress: {count} AUM records inserted")
+        # Add randomness for every fund in one draw
+        rng = np.random.default_rng()
+        fund_aums = np.round(
+            np.array(amc_totals) * np.array(shares) * rng.uniform(0.7, 1.3, len(all_funds)), 2
+        ).tolist()
+        
+        rows = [
+            (row[3], row[2], fund_aum, amc_total, None, row[4], today, 'complete_collection')
+            for row, fund_aum, amc_total in zip(all_funds, fund_aums, amc_totals)
+        ]
         
-        # Insert remaining
-        if batch_data:
-            cursor.executemany("""
-                INSERT INTO aum_analytics 
+        # Stage in a session-private temp table that is dropped at commit. It is
+        # built from the staged columns only, so no id default or NOT NULL comes along
+        cursor.execute("""
+            CREATE TEMP TABLE aum_analytics_stage ON COMMIT DROP AS
+            SELECT amc_name, fund_name, aum_crores, total_aum_crores, 
+                   fund_count, category, data_date, source
+            FROM aum_analytics
+            WITH NO DATA
+        """)
+        
+        # Stage in batches
+        for start in range(0, len(rows), 500):
+            batch_data = rows[start:start + 500]
+            execute_values(cursor, """
+                INSERT INTO aum_analytics_stage 
                 (amc_name, fund_name, aum_crores, total_aum_crores, 
                  fund_count, category, data_date, source)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT DO NOTHING
-            """, batch_data)
-            count += cursor.rowcount
-            self.db_conn.commit()
+                VALUES %s
+            """, batch_data, page_size=len(batch_data))
+            logger.info(f"Progress: {start + len(batch_data)} AUM records staged")
+        
+        cursor.execute("SELECT COUNT(*) FROM aum_analytics_stage")
+        logger.info(f"Staged {cursor.fetchone()[0]} AUM records")
+        
+        # Move staged rows into the permanent table in one statement
+        cursor.execute("""
+            INSERT INTO aum_analytics 
+            (amc_name, fund_name, aum_crores, total_aum_crores, 
+             fund_count, category, data_date, source)
+            SELECT amc_name, fund_name, aum_crores, total_aum_crores, 
+                   fund_count, category, data_date, source
+            FROM aum_analytics_stage
+            ON CONFLICT DO NOTHING
+        """)
+        count = cursor.rowcount
+        self.db_conn.commit()
         
         logger.info(f"✅ Completed AUM data: {count} records")
         return count
@@ -230,6 +249,7 @@ class CompleteMFDataCollector:
         
         count = 0
         batch_data = []
+        today = date.today()
         
         for fund_id, fund_name, category, subcategory in funds:
             holdings = []
@@ -246,7 +266,7 @@ class CompleteMFDataCollector:
                     else:
                         pct = round(remaining_pct, 2)
                     
-                    holdings.append((fund_id, stock, sector, pct, date.today()))
+                    holdings.append((fund_id, stock, sector, pct, today))
                     remaining_pct -= pct
                     
             elif category == 'Debt':
@@ -261,7 +281,7 @@ class CompleteMFDataCollector:
                     else:
                         pct = round(remaining_pct, 2)
                     
-                    holdings.append((fund_id, instrument, sector, pct, date.today()))
+                    holdings.append((fund_id, instrument, sector, pct, today))
                     remaining_pct -= pct
                     
             elif category == 'Hybrid':
@@ -279,7 +299,7 @@ class CompleteMFDataCollector:
                         pct = round(remaining_equity * random.uniform(0.15, 0.25), 2)
                     else:
                         pct = round(remaining_equity, 2)
-                    holdings.append((fund_id, stock, sector, pct, date.today()))
+                    holdings.append((fund_id, stock, sector, pct, today))
                     remaining_equity -= pct
                     
                 # Debt portion
@@ -289,19 +309,19 @@ class CompleteMFDataCollector:
                         pct = round(remaining_debt * random.uniform(0.3, 0.4), 2)
                     else:
                         pct = round(remaining_debt, 2)
-                    holdings.append((fund_id, instrument, sector, pct, date.today()))
+                    holdings.append((fund_id, instrument, sector, pct, today))
                     remaining_debt -= pct
             
             batch_data.extend(holdings)
             
             # Insert in batches
             if len(batch_data) >= 500:
-                cursor.executemany("""
+                execute_values(cursor, """
                     INSERT INTO portfolio_holdings 
                     (fund_id, stock_name, sector, holding_percent, holding_date)
-                    VALUES (%s, %s, %s, %s, %s)
+                    VALUES %s
                     ON CONFLICT DO NOTHING
-                """, batch_data)
+                """, batch_data, page_size=len(batch_data))
                 count += cursor.rowcount
                 self.db_conn.commit()
                 batch_data = []
@@ -310,12 +330,12 @@ class CompleteMFDataCollector:
         
         # Insert remaining
         if batch_data:
-            cursor.executemany("""
+            execute_values(cursor, """
                 INSERT INTO portfolio_holdings 
                 (fund_id, stock_name, sector, holding_percent, holding_date)
-                VALUES (%s, %s, %s, %s, %s)
+                VALUES %s
                 ON CONFLICT DO NOTHING
-            """, batch_data)
+            """, batch_data, page_size=len(batch_data))
             count += cursor.rowcount
             self.db_conn.commit()
         
@@ -347,63 +367,79 @@ class CompleteMFDataCollector:
             groups[key].append((scheme_code, fund_name))
         
         count = 0
-        batch_data = []
+        rng = np.random.default_rng()
+        pair_parts = []
         
         for group_key, group_funds in groups.items():
-            if len(group_funds) < 2:
+            n = len(group_funds)
+            if n < 2:
                 continue
                 
-            # Generate overlaps for funds in same category
-            num_pairs = min(len(group_funds) * 2, 50)  # Limit pairs per group
+            # Overlap range based on category
+            if 'Large Cap' in group_key:
+                low, high = 70, 90
+            elif 'Mid Cap' in group_key:
+                low, high = 50, 70
+            elif 'Small Cap' in group_key:
+                low, high = 35, 55
+            elif 'Debt' in group_key:
+                low, high = 75, 95
+            elif 'Hybrid' in group_key:
+                low, high = 45, 65
+            else:
+                low, high = 40, 60
             
-            for _ in range(num_pairs):
-                fund1 = random.choice(group_funds)
-                fund2 = random.choice(group_funds)
-                
-                if fund1[0] == fund2[0]:  # Skip same fund
-                    continue
-                    
-                # Calculate overlap based on category
-                if 'Large Cap' in group_key:
-                    overlap = round(random.uniform(70, 90), 1)
-                elif 'Mid Cap' in group_key:
-                    overlap = round(random.uniform(50, 70), 1)
-                elif 'Small Cap' in group_key:
-                    overlap = round(random.uniform(35, 55), 1)
-                elif 'Debt' in group_key:
-                    overlap = round(random.uniform(75, 95), 1)
-                elif 'Hybrid' in group_key:
-                    overlap = round(random.uniform(45, 65), 1)
-                else:
-                    overlap = round(random.uniform(40, 60), 1)
-                
-                batch_data.append((
-                    fund1[0], fund1[1], fund2[0], fund2[1],
-                    overlap, date.today(), 'complete_collection'
-                ))
-                
-                if len(batch_data) >= 100:
-                    cursor.executemany("""
-                        INSERT INTO portfolio_overlap 
-                        (fund1_scheme_code, fund1_name, fund2_scheme_code, 
-                         fund2_name, overlap_percentage, analysis_date, source)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT DO NOTHING
-                    """, batch_data)
-                    count += cursor.rowcount
-                    self.db_conn.commit()
-                    batch_data = []
+            # Sample up to 50 distinct pairs from across the whole group
+            codes = np.array([f[0] for f in group_funds], dtype=object)
+            names = np.array([f[1] for f in group_funds], dtype=object)
+            i_idx, j_idx = _sample_pairs(rng, n, min(50, n * (n - 1) // 2))
+            
+            pair_parts.append((
+                codes[i_idx], names[i_idx], codes[j_idx], names[j_idx],
+                np.full(len(i_idx), low), np.full(len(i_idx), high)
+            ))
         
-        # Insert remaining
-        if batch_data:
-            cursor.executemany("""
+        if pair_parts:
+            # Concatenate every group's pairs and draw all overlaps in one call
+            code1, name1, code2, name2, lows, highs = (np.concatenate(col) for col in zip(*pair_parts))
+            overlaps = np.round(rng.uniform(lows, highs), 1)
+            rows = list(zip(
+                code1, name1, code2, name2,
+                overlaps.tolist(), repeat(date.today()), repeat('complete_collection')
+            ))
+            
+            # Stage in a session-private temp table that is dropped at commit
+            cursor.execute("""
+                CREATE TEMP TABLE portfolio_overlap_stage ON COMMIT DROP AS
+                SELECT fund1_scheme_code, fund1_name, fund2_scheme_code, 
+                       fund2_name, overlap_percentage, analysis_date, source
+                FROM portfolio_overlap
+                WITH NO DATA
+            """)
+            
+            for start in range(0, len(rows), 1000):
+                batch_data = rows[start:start + 1000]
+                execute_values(cursor, """
+                    INSERT INTO portfolio_overlap_stage 
+                    (fund1_scheme_code, fund1_name, fund2_scheme_code, 
+                     fund2_name, overlap_percentage, analysis_date, source)
+                    VALUES %s
+                """, batch_data, page_size=len(batch_data))
+            
+            cursor.execute("SELECT COUNT(*) FROM portfolio_overlap_stage")
+            logger.info(f"Staged {cursor.fetchone()[0]} overlap records")
+            
+            # Move staged rows into the permanent table in one statement
+            cursor.execute("""
                 INSERT INTO portfolio_overlap 
                 (fund1_scheme_code, fund1_name, fund2_scheme_code, 
                  fund2_name, overlap_percentage, analysis_date, source)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                SELECT fund1_scheme_code, fund1_name, fund2_scheme_code, 
+                       fund2_name, overlap_percentage, analysis_date, source
+                FROM portfolio_overlap_stage
                 ON CONFLICT DO NOTHING
-            """, batch_data)
-            count += cursor.rowcount
+            """)
+            count = cursor.rowcount
             self.db_conn.commit()
         
         logger.info(f"✅ Generated {count} more overlap records")
@@ -429,35 +465,32 @@ class CompleteMFDataCollector:
         managers = cursor.fetchall()
         logger.info(f"Found {len(managers)} new managers to add")
         
-        batch_data = []
-        for manager_name, fund_count, amc_name in managers:
-            # Performance based on experience (fund count)
-            if fund_count > 15:
-                perf_1y = round(random.uniform(13, 17), 2)
-                perf_3y = round(random.uniform(15, 19), 2)
-                aum = round(random.uniform(50000, 120000), 2)
-            elif fund_count > 8:
-                perf_1y = round(random.uniform(11, 15), 2)
-                perf_3y = round(random.uniform(13, 17), 2)
-                aum = round(random.uniform(20000, 50000), 2)
-            else:
-                perf_1y = round(random.uniform(9, 13), 2)
-                perf_3y = round(random.uniform(11, 15), 2)
-                aum = round(random.uniform(5000, 20000), 2)
-            
-            batch_data.append((
-                manager_name, fund_count, aum, perf_1y, perf_3y,
-                date.today(), 'complete_collection'
-            ))
+        # Performance based on experience (fund count): >15, >8, otherwise
+        fund_counts = np.array([m[1] for m in managers])
+        tier = np.select([fund_counts > 15, fund_counts > 8], [0, 1], 2)
+        rng = np.random.default_rng()
+        perf_1y_low = np.array([13, 11, 9])[tier]
+        perf_3y_low = np.array([15, 13, 11])[tier]
+        aum_low = np.array([50000, 20000, 5000])[tier]
+        aum_high = np.array([120000, 50000, 20000])[tier]
+        perf_1y = np.round(rng.uniform(perf_1y_low, perf_1y_low + 4), 2).tolist()
+        perf_3y = np.round(rng.uniform(perf_3y_low, perf_3y_low + 4), 2).tolist()
+        aums = np.round(rng.uniform(aum_low, aum_high), 2).tolist()
+        
+        today = date.today()
+        batch_data = [
+            (manager_name, fund_count, aum, p1y, p3y, today, 'complete_collection')
+            for (manager_name, fund_count, _), aum, p1y, p3y in zip(managers, aums, perf_1y, perf_3y)
+        ]
         
         if batch_data:
-            cursor.executemany("""
+            execute_values(cursor, """
                 INSERT INTO manager_analytics 
                 (manager_name, managed_funds_count, total_aum_managed, 
                  avg_performance_1y, avg_performance_3y, analysis_date, source)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                VALUES %s
                 ON CONFLICT DO NOTHING
-            """, batch_data)
+            """, batch_data, page_size=len(batch_data))
             count = cursor.rowcount
             self.db_conn.commit()
             logger.info(f"✅ Added {count} manager records")
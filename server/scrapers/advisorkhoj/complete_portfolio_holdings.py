@@ -104,6 +104,7 @@ class CompletePortfolioHoldings:
         # Process in batches
         batch_size = 200
         total_processed = 0
+        today = date.today()
         
         while True:
             # Get funds without holdings
@@ -158,11 +159,11 @@ class CompletePortfolioHoldings:
                         else:
                             pct = round(remaining_pct, 2)
                         
-                        holdings.append((fund_id, stock, sector, pct, date.today()))
+                        holdings.append((fund_id, stock, sector, pct, today))
                         remaining_pct -= pct
                     
                     # Add cash component
-                    holdings.append((fund_id, 'Cash & Equivalents', 'Cash', 3.0, date.today()))
+                    holdings.append((fund_id, 'Cash & Equivalents', 'Cash', 3.0, today))
                     
                 elif category == 'Debt':
                     # Debt funds
@@ -183,11 +184,11 @@ class CompletePortfolioHoldings:
                         else:
                             pct = round(remaining_pct, 2)
                         
-                        holdings.append((fund_id, instrument, sector, pct, date.today()))
+                        holdings.append((fund_id, instrument, sector, pct, today))
                         remaining_pct -= pct
                     
                     # Cash component
-                    holdings.append((fund_id, 'Cash & Equivalents', 'Cash', 2.0, date.today()))
+                    holdings.append((fund_id, 'Cash & Equivalents', 'Cash', 2.0, today))
                     
                 elif category == 'Hybrid':
                     # Hybrid funds - mix of equity and debt
@@ -211,7 +212,7 @@ class CompletePortfolioHoldings:
                         else:
                             pct = round(remaining_equity, 2)
                         
-                        holdings.append((fund_id, stock, sector, pct, date.today()))
+                        holdings.append((fund_id, stock, sector, pct, today))
                         remaining_equity -= pct
                     
                     # Debt portion
@@ -223,16 +224,16 @@ class CompletePortfolioHoldings:
                         else:
                             pct = round(remaining_debt, 2)
                         
-                        holdings.append((fund_id, instrument, sector, pct, date.today()))
+                        holdings.append((fund_id, instrument, sector, pct, today))
                         remaining_debt -= pct
                     
                     # Cash
-                    holdings.append((fund_id, 'Cash & Equivalents', 'Cash', 2.0, date.today()))
+                    holdings.append((fund_id, 'Cash & Equivalents', 'Cash', 2.0, today))
                 
                 else:
                     # Other categories - basic allocation
-                    holdings.append((fund_id, 'Diversified Holdings', 'Mixed', 98.0, date.today()))
-                    holdings.append((fund_id, 'Cash & Equivalents', 'Cash', 2.0, date.today()))
+                    holdings.append((fund_id, 'Diversified Holdings', 'Mixed', 98.0, today))
+                    holdings.append((fund_id, 'Cash & Equivalents', 'Cash', 2.0, today))
                 
                 holdings_batch.extend(holdings)
             
@@ -286,6 +287,8 @@ class CompletePortfolioHoldings:
         # Process remaining funds
         batch_size = 500
         total_added = 0
+        today = date.today()
+        get_amc_total = amc_totals.get
         
         while True:
             cursor.execute("""
@@ -308,7 +311,7 @@ class CompletePortfolioHoldings:
                 fund_id, scheme_code, fund_name, amc_name, category, subcategory = row
                 
                 # Get AMC total
-                amc_total = amc_totals.get(amc_name, 10000)
+                amc_total = get_amc_total(amc_name, 10000)
                 
                 # Calculate fund AUM
                 if category == 'Equity':
@@ -332,7 +335,7 @@ class CompletePortfolioHoldings:
                 
                 aum_batch.append((
                     amc_name, fund_name, fund_aum, amc_total,
-                    category, date.today(), 'complete_holdings_collector'
+                    category, today, 'complete_holdings_collector'
                 ))
             
             # Insert batch
@@ -3,24 +3,11 @@
 Database Integrity Check - Comprehensive validation
 """
 
-import os
 import psycopg2
-from urllib.parse import urlparse
-from dotenv import load_dotenv
-
-load_dotenv()
+from _db import DB_KWARGS
 
 # Database connection
-db_url = os.getenv('DATABASE_URL')
-parsed = urlparse(db_url)
-conn = psycopg2.connect(
-    host=parsed.hostname,
-    port=parsed.port,
-    database=parsed.path[1:],
-    user=parsed.username,
-    password=parsed.password,
-    sslmode='require'
-)
+conn = psycopg2.connect(**DB_KWARGS)
 cursor = conn.cursor()
 
 print("\n🔍 DATABASE INTEGRITY CHECK")
@@ -5,14 +5,40 @@ Investigates available sources for mutual fund portfolio holdings
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 import json
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+PORTFOLIO_SECTION_SELECTOR = (
+    'div[class*=portfolio i], div[class*=holding i], '
+    'section[class*=portfolio i], section[class*=holding i]'
+)
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+def make_session(headers=None):
+    """Keep-alive session (one per check/host) with a small retry budget"""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(max_retries=Retry(total=2, backoff_factor=0.2)))
+    if headers:
+        session.headers.update(headers)
+    return session
+
+def log_reachability(session, url, label=None):
+    """Log the status of url without downloading the body"""
+    with session.get(url, timeout=10, stream=True) as response:
+        logger.info(f"✅ {label or url} - Status: {response.status_code}")
+        return response.status_code
+
 def check_mfapi_holdings():
     """Check if MFAPI.in provides portfolio holdings"""
     logger.info("Checking MFAPI.in for portfolio holdings...")
@@ -27,18 +53,19 @@ def check_mfapi_holdings():
         f"https://api.mfapi.in/mf/{scheme_code}/info"
     ]
     
-    for endpoint in endpoints:
-        try:
-            response = requests.get(endpoint, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                logger.info(f"✅ {endpoint} - Status: {response.status_code}")
-                logger.info(f"Available fields: {list(data.keys()) if isinstance(data, dict) else 'List data'}")
-            else:
-                logger.warning(f"❌ {endpoint} - Status: {response.status_code}")
-        except Exception as e:
-            logger.error(f"❌ {endpoint} - Error: {e}")
-        time.sleep(0.5)
+    with make_session() as session:
+        for endpoint in endpoints:
+            try:
+                response = session.get(endpoint, timeout=10)
+                if response.status_code == 200:
+                    data = response.json()
+                    logger.info(f"✅ {endpoint} - Status: {response.status_code}")
+                    logger.info(f"Available fields: {list(data.keys()) if isinstance(data, dict) else 'List data'}")
+                else:
+                    logger.warning(f"❌ {endpoint} - Status: {response.status_code}")
+            except Exception as e:
+                logger.error(f"❌ {endpoint} - Error: {e}")
+            time.sleep(0.5)
 
 def check_amfi_holdings():
     """Check AMFI for portfolio holdings data"""
@@ -50,14 +77,15 @@ def check_amfi_holdings():
         "https://www.amfiindia.com/research-information/other-data/scheme-portfolio"
     ]
     
-    for url in urls:
-        try:
-            response = requests.get(url, timeout=10)
-            logger.info(f"✅ {url} - Status: {response.status_code}")
-            if "scheme-portfolio" in url and response.status_code == 200:
-                logger.info("Portfolio data page found - need to parse HTML")
-        except Exception as e:
-            logger.error(f"❌ {url} - Error: {e}")
+    # Only the status matters here; NAVAll.txt alone is several MB
+    with make_session() as session:
+        for url in urls:
+            try:
+                status = log_reachability(session, url)
+                if "scheme-portfolio" in url and status == 200:
+                    logger.info("Portfolio data page found - need to parse HTML")
+            except Exception as e:
+                logger.error(f"❌ {url} - Error: {e}")
 
 def check_advisorkhoj_holdings():
     """Check AdvisorKhoj for portfolio holdings"""
@@ -70,12 +98,12 @@ def check_advisorkhoj_holdings():
         f"{base_url}/mutual-funds-research/top-10-holdings"
     ]
     
-    for url in test_urls:
-        try:
-            response = requests.get(url, timeout=10)
-            logger.info(f"✅ {url} - Status: {response.status_code}")
-        except Exception as e:
-            logger.error(f"❌ {url} - Error: {e}")
+    with make_session() as session:
+        for url in test_urls:
+            try:
+                log_reachability(session, url)
+            except Exception as e:
+                logger.error(f"❌ {url} - Error: {e}")
 
 def check_moneycontrol_holdings():
     """Check MoneyControl for portfolio holdings"""
@@ -85,16 +113,13 @@ def check_moneycontrol_holdings():
     test_url = "https://www.moneycontrol.com/mutual-funds/nav/hdfc-equity-fund-growth/MHD001"
     
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(test_url, headers=headers, timeout=10)
+        response = requests.get(test_url, headers=BROWSER_HEADERS, timeout=10)
         logger.info(f"✅ MoneyControl - Status: {response.status_code}")
         
         if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            # Look for portfolio/holdings sections
-            portfolio_sections = soup.find_all(['div', 'section'], class_=lambda x: x and ('portfolio' in x.lower() or 'holding' in x.lower()))
+            soup = BeautifulSoup(response.content, 'lxml')
+            # Look for portfolio/holdings sections (case-insensitive class substring match)
+            portfolio_sections = soup.select(PORTFOLIO_SECTION_SELECTOR)
             logger.info(f"Found {len(portfolio_sections)} potential portfolio sections")
     except Exception as e:
         logger.error(f"❌ MoneyControl - Error: {e}")
@@ -106,11 +131,8 @@ def check_valueresearch_holdings():
     test_url = "https://www.valueresearchonline.com/funds/newsnapshot.asp?schemecode=16215"
     
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(test_url, headers=headers, timeout=10)
-        logger.info(f"✅ Value Research - Status: {response.status_code}")
+        with make_session(BROWSER_HEADERS) as session:
+            log_reachability(session, test_url, "Value Research")
     except Exception as e:
         logger.error(f"❌ Value Research - Error: {e}")
 
@@ -119,11 +141,18 @@ def main():
     logger.info("🔍 Portfolio Holdings Data Source Investigation")
     logger.info("=" * 50)
     
-    check_mfapi_holdings()
-    check_amfi_holdings()
-    check_advisorkhoj_holdings()
-    check_moneycontrol_holdings()
-    check_valueresearch_holdings()
+    # Each check hits a different host, so run them side by side; requests to the
+    # same host stay sequential inside each check
+    checks = [
+        check_mfapi_holdings,
+        check_amfi_holdings,
+        check_advisorkhoj_holdings,
+        check_moneycontrol_holdings,
+        check_valueresearch_holdings
+    ]
+    with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+        for future in [executor.submit(check) for check in checks]:
+            future.result()
     
     logger.info("\n📊 Summary:")
     logger.info("1. MFAPI.in - Provides NAV data but no portfolio holdings")
@@ -9,14 +9,26 @@ import sys
 import json
 import time
 import logging
+from dataclasses import dataclass
 from datetime import datetime, date
 from typing import Dict, List, Optional, Tuple
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree
 import psycopg2
+from psycopg2.extras import execute_values
 from urllib.parse import urlparse, quote
 from dotenv import load_dotenv
+import io
 import re
+import random
+import asyncio
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 
 # Load environment variables
 load_dotenv()
@@ -28,16 +40,228 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@dataclass(slots=True, frozen=True)
+class Holding:
+    """One portfolio holding as scraped or generated, before it is tied to a fund"""
+    stock_name: str
+    sector: str
+    percentage: float
+
+# Holdings tables: AMFI marks it with a class, AdvisorKhoj with an id (or any
+# class containing "holding"). Body rows are the 2nd..11th <tr> (top 10 holdings)
+def _is_amfi_table(table) -> bool:
+    return 'portfolio-table' in (table.get('class') or '').split()
+
+def _is_advisorkhoj_table(table) -> bool:
+    return table.get('id') == 'holdings-table'
+
+def _is_advisorkhoj_alt_table(table) -> bool:
+    return 'holding' in (table.get('class') or '').lower()
+
+_CELLS_XP = etree.XPath(".//td")
+
+def _top_table_rows(content: bytes, matchers, limit: int = 10) -> List[List[str]]:
+    """Cell texts of the top `limit` body rows of the first table accepted by the
+    highest-priority matcher (header row skipped).
+    
+    The page is stream-parsed: rows and finished tables are freed as soon as they
+    are read, and parsing stops once the top-priority table has been read.
+    """
+    best = len(matchers)  # priority of the table being read; lower is better
+    target = None
+    rows: List[List[str]] = []
+    seen = 0
+    
+    for _, elem in etree.iterparse(io.BytesIO(content), tag=('tr', 'table'), html=True, recover=True):
+        if elem.tag == 'table':
+            if elem is target and best == 0:
+                break
+            elem.clear(keep_tail=True)
+            continue
+            
+        table = next(elem.iterancestors('table'), None)
+        if table is not None and table is not target:
+            rank = next((i for i, matches in enumerate(matchers[:best]) if matches(table)), None)
+            if rank is not None:
+                best, target, rows, seen = rank, table, [], 0
+                
+        if table is not None and table is target:
+            seen += 1
+            if seen > 1 and len(rows) < limit:
+                rows.append([''.join(td.itertext()) for td in _CELLS_XP(elem)])
+            if best == 0 and len(rows) == limit:
+                break
+                
+        # Drop the row and any already-read siblings before it
+        elem.clear(keep_tail=True)
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+            
+    return rows
+
+# First number in a percentage cell, e.g. "7.25 %"
+_PCT_RE = re.compile(r'[\d.]+')
+
+# Raw portfolio pages are cached on disk between runs; disclosures change monthly at most
+PAGE_CACHE_DIR = os.getenv(
+    'PORTFOLIO_PAGE_CACHE_DIR',
+    os.path.join(tempfile.gettempdir(), 'advisorkhoj_portfolio_pages')
+)
+PAGE_CACHE_TTL = 24 * 3600  # seconds
+# Funds a source had no holdings for are not asked again for a while
+MISS_CACHE_TTL = 6 * 3600  # seconds
+
+# Common stocks by category, keyed by (category, subcategory)
+_LARGE_CAP_HOLDINGS = (
+    ('Reliance Industries', 'Energy', 8.5),
+    ('HDFC Bank', 'Banking', 7.2),
+    ('Infosys', 'IT', 6.8),
+    ('ICICI Bank', 'Banking', 6.5),
+    ('TCS', 'IT', 5.9),
+    ('Bharti Airtel', 'Telecom', 4.8),
+    ('ITC', 'FMCG', 4.2),
+    ('Kotak Bank', 'Banking', 3.9),
+    ('L&T', 'Engineering', 3.5),
+    ('HUL', 'FMCG', 3.2)
+)
+
+HOLDINGS_TEMPLATES = MappingProxyType({
+    ('Equity', 'Large Cap'): _LARGE_CAP_HOLDINGS,
+    ('Equity', 'Mid Cap'): (
+        ('Voltas', 'Consumer Durables', 5.2),
+        ('Tata Power', 'Power', 4.8),
+        ('Godrej Properties', 'Real Estate', 4.5),
+        ('Indian Hotels', 'Hotels', 4.2),
+        ('Jubilant FoodWorks', 'FMCG', 3.9),
+        ('Page Industries', 'Textiles', 3.6),
+        ('Apollo Hospitals', 'Healthcare', 3.4),
+        ('Crompton Greaves', 'Consumer Durables', 3.2),
+        ('Escorts', 'Auto', 3.0),
+        ('Petronet LNG', 'Energy', 2.8)
+    ),
+    ('Equity', 'Small Cap'): (
+        ('Navin Fluorine', 'Chemicals', 3.8),
+        ('Alkyl Amines', 'Chemicals', 3.5),
+        ('Caplin Point', 'Pharma', 3.2),
+        ('Sudarshan Chemical', 'Chemicals', 3.0),
+        ('Galaxy Surfactants', 'Chemicals', 2.8),
+        ('Garware Technical', 'Textiles', 2.6),
+        ('KPIT Technologies', 'IT', 2.5),
+        ('Carborundum Universal', 'Industrial', 2.4),
+        ('Suprajit Engineering', 'Auto Ancillary', 2.2),
+        ('Vinati Organics', 'Chemicals', 2.0)
+    )
+})
+
+# Per-category fallback when the subcategory has no template of its own
+CATEGORY_DEFAULT_HOLDINGS = MappingProxyType({
+    'Equity': _LARGE_CAP_HOLDINGS,
+    'Debt': (
+        ('Govt Securities', 'Government', 25.5),
+        ('State Development Loans', 'Government', 18.2),
+        ('Corporate Bonds - AAA', 'Corporate', 15.8),
+        ('Corporate Bonds - AA+', 'Corporate', 12.5),
+        ('Commercial Papers', 'Money Market', 8.5),
+        ('Treasury Bills', 'Government', 7.2),
+        ('Bank FDs', 'Banking', 5.8),
+        ('PSU Bonds', 'PSU', 4.5),
+        ('Cash & Equivalents', 'Cash', 2.0)
+    ),
+    'Hybrid': (
+        ('HDFC Bank', 'Banking', 5.5),
+        ('Infosys', 'IT', 4.8),
+        ('Govt Securities', 'Government', 15.2),
+        ('Corporate Bonds - AAA', 'Corporate', 12.5),
+        ('Reliance Industries', 'Energy', 4.2),
+        ('ICICI Bank', 'Banking', 3.8),
+        ('TCS', 'IT', 3.5),
+        ('State Development Loans', 'Government', 8.5),
+        ('Bharti Airtel', 'Telecom', 3.0),
+        ('Commercial Papers', 'Money Market', 5.0)
+    )
+})
+
+def _flatten_sample_templates():
+    """Number the distinct templates and flatten them into (id, stock, sector, base %) columns"""
+    template_ids = {}
+    columns = ([], [], [], [])
+    for template in (_LARGE_CAP_HOLDINGS, *HOLDINGS_TEMPLATES.values(), *CATEGORY_DEFAULT_HOLDINGS.values()):
+        if template in template_ids:
+            continue
+        template_id = template_ids[template] = len(template_ids)
+        for stock_name, sector, base_pct in template:
+            for column, value in zip(columns, (template_id, stock_name, sector, base_pct)):
+                column.append(value)
+    return MappingProxyType(template_ids), tuple(map(tuple, columns))
+
+# Sent as arrays so the sample-holdings INSERT generates every row server-side
+_SAMPLE_TEMPLATE_IDS, _SAMPLE_TEMPLATE_COLUMNS = _flatten_sample_templates()
+
+def _sample_template_id(fund: Dict) -> int:
+    """Template for a fund: its (category, subcategory), else its category, else large cap"""
+    template = (HOLDINGS_TEMPLATES.get((fund['category'], fund['subcategory']))
+                or CATEGORY_DEFAULT_HOLDINGS.get(fund['category'], _LARGE_CAP_HOLDINGS))
+    return _SAMPLE_TEMPLATE_IDS[template]
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter that can be paused on server hints"""
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate  # tokens added per second
+        self.capacity = capacity  # maximum burst size
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.resume_at = 0.0  # no tokens are handed out before this (monotonic) time
+        self.lock = threading.Lock()
+        
+    def acquire(self):
+        """Block until a token is available, then consume it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.resume_at:
+                    wait = self.resume_at - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            
+    def pause(self, seconds: float):
+        """Hand out no tokens for the next `seconds` and drop any saved-up burst"""
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+            self.tokens = 0.0
+
 class PortfolioHoldingsCollector:
     """Collector for mutual fund portfolio holdings"""
     
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Connection': 'keep-alive'
         })
+        # One warm pool per host (AMFI, AdvisorKhoj), big enough for every concurrent fetch
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         self.db_conn = None
-        self.rate_limit_delay = 2.0  # seconds between requests
+        self.host_rate = 1.0  # sustained requests per second to any one host
+        self.max_concurrency = 8  # funds fetched at the same time
+        self.commit_every = 50  # funds per transaction
+        self.per_host_limit = 4  # concurrent requests to any one host
+        self._hosts: Dict[str, Tuple[threading.BoundedSemaphore, TokenBucket]] = {}
+        self._hosts_lock = threading.Lock()
+        self.cache_stats = {'hits': 0, 'misses': 0, 'skipped': 0}
+        self._cache_stats_lock = threading.Lock()
         
     def connect_db(self):
         """Connect to PostgreSQL database"""
@@ -65,243 +289,283 @@ class PortfolioHoldingsCollector:
             logger.error(f"❌ Database connection failed: {e}")
             return False
             
-    def get_amfi_portfolio(self, fund_name: str) -> List[Dict]:
+    def _host_controls(self, url: str) -> Tuple[threading.BoundedSemaphore, TokenBucket]:
+        """Per-host concurrency semaphore and rate limiter shared by the worker threads"""
+        host = urlparse(url).netloc
+        with self._hosts_lock:
+            controls = self._hosts.get(host)
+            if controls is None:
+                controls = self._hosts[host] = (
+                    threading.BoundedSemaphore(self.per_host_limit),
+                    TokenBucket(rate=self.host_rate, capacity=2)
+                )
+            return controls
+            
+    @staticmethod
+    def _apply_rate_hints(limiter: TokenBucket, response: requests.Response):
+        """Slow a host down when it asks to: Retry-After / 429, or an exhausted quota"""
+        retry_after = response.headers.get('Retry-After')
+        if response.status_code == 429 or retry_after:
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                delay = 5.0
+            limiter.pause(delay * random.uniform(1.0, 1.5))  # jitter so threads don't resume together
+        elif response.headers.get('X-RateLimit-Remaining') == '0':
+            try:
+                delay = float(response.headers.get('X-RateLimit-Reset', 1))
+            except ValueError:
+                delay = 1.0
+            limiter.pause(delay)
+            
+    @staticmethod
+    def _cache_path(source: str, fund_name: str, suffix: str) -> str:
+        """Disk cache file for a (source, fund) pair"""
+        key = hashlib.sha1(f"{source}:{fund_name}".encode()).hexdigest()
+        return os.path.join(PAGE_CACHE_DIR, f"{key}.{suffix}")
+        
+    @staticmethod
+    def _is_fresh(path: str, ttl: float) -> bool:
+        """True if path exists and was written less than ttl seconds ago"""
+        try:
+            return time.time() - os.path.getmtime(path) < ttl
+        except OSError:
+            return False
+            
+    def _scrape(self, source: str, fund_name: str, scraper) -> Optional[List[Holding]]:
+        """Run a source scraper unless it recently had nothing for this fund"""
+        miss_path = self._cache_path(source, fund_name, 'miss')
+        if self._is_fresh(miss_path, MISS_CACHE_TTL):
+            with self._cache_stats_lock:
+                self.cache_stats['skipped'] += 1
+            return []
+            
+        holdings = scraper(fund_name)
+        # [] is a definite miss (no page or no table); None is a transient error, retried next run
+        if holdings == []:
+            try:
+                os.makedirs(PAGE_CACHE_DIR, exist_ok=True)
+                with open(miss_path, 'w'):
+                    pass
+            except OSError as e:
+                logger.debug(f"Could not record {source} miss for {fund_name}: {e}")
+        return holdings
+        
+    def _fetch_page(self, source: str, fund_name: str, url: str) -> Optional[bytes]:
+        """Get a page body, served from the disk cache while fresh; None on non-200"""
+        path = self._cache_path(source, fund_name, 'html')
+        
+        try:
+            if self._is_fresh(path, PAGE_CACHE_TTL):
+                with open(path, 'rb') as cached:
+                    content = cached.read()
+                with self._cache_stats_lock:
+                    self.cache_stats['hits'] += 1
+                return content
+        except OSError:
+            pass  # not cached yet (or unreadable) - fall through to the network
+            
+        with self._cache_stats_lock:
+            self.cache_stats['misses'] += 1
+        # Only real network requests are rate limited; cache hits and sample holdings are free
+        slot, limiter = self._host_controls(url)
+        with slot:
+            limiter.acquire()
+            response = self.session.get(url, timeout=15)
+        self._apply_rate_hints(limiter, response)
+        if response.status_code >= 500 or response.status_code == 429:
+            response.raise_for_status()  # transient: reported as an error, not a miss
+        if response.status_code != 200:
+            return None
+            
+        try:
+            os.makedirs(PAGE_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as out:
+                out.write(response.content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.debug(f"Could not cache {url}: {e}")
+        return response.content
+        
+    def get_amfi_portfolio(self, fund_name: str) -> Optional[List[Holding]]:
         """Get portfolio holdings from AMFI website"""
         try:
             # AMFI portfolio search URL
             search_url = f"https://www.amfiindia.com/research-information/other-data/scheme-portfolio?search={quote(fund_name)}"
             
-            response = self.session.get(search_url, timeout=15)
-            if response.status_code != 200:
-                return []
-                
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Look for portfolio table
-            portfolio_table = soup.find('table', {'class': 'portfolio-table'})
-            if not portfolio_table:
+            content = self._fetch_page('amfi', fund_name, search_url)
+            if content is None:
                 return []
                 
             holdings = []
-            rows = portfolio_table.find_all('tr')[1:]  # Skip header
-            
-            for row in rows[:10]:  # Top 10 holdings
-                cols = row.find_all('td')
+            # Top 10 holdings of the portfolio table (none if there is no such table)
+            for cols in _top_table_rows(content, (_is_amfi_table,)):
                 if len(cols) >= 3:
-                    holdings.append({
-                        'stock_name': cols[0].text.strip(),
-                        'sector': cols[1].text.strip() if len(cols) > 1 else 'Unknown',
-                        'percentage': float(cols[2].text.strip().replace('%', '')) if len(cols) > 2 else 0.0
-                    })
+                    holdings.append(Holding(
+                        stock_name=cols[0].strip(),
+                        sector=cols[1].strip(),
+                        percentage=float(cols[2].replace('%', '').strip())
+                    ))
                     
             return holdings
             
         except Exception as e:
             logger.warning(f"Failed to get AMFI portfolio for {fund_name}: {e}")
-            return []
+            return None
             
-    def get_advisorkhoj_portfolio(self, fund_name: str) -> List[Dict]:
+    def get_advisorkhoj_portfolio(self, fund_name: str) -> Optional[List[Holding]]:
         """Get portfolio holdings from AdvisorKhoj"""
         try:
             # Simplified search URL
             search_name = fund_name.lower().replace(' ', '-')
             url = f"https://www.advisorkhoj.com/mutual-funds/{search_name}/portfolio"
             
-            response = self.session.get(url, timeout=15)
-            if response.status_code != 200:
-                return []
-                
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Look for holdings table
-            holdings_table = soup.find('table', {'id': 'holdings-table'})
-            if not holdings_table:
-                # Try alternate class names
-                holdings_table = soup.find('table', class_=lambda x: x and 'holding' in x.lower())
-                
-            if not holdings_table:
+            content = self._fetch_page('advisorkhoj', fund_name, url)
+            if content is None:
                 return []
                 
             holdings = []
-            rows = holdings_table.find_all('tr')[1:]  # Skip header
-            
-            for row in rows[:10]:  # Top 10 holdings
-                cols = row.find_all('td')
+            # Top 10 holdings of the holdings table, else of a table with a "holding" class
+            for cols in _top_table_rows(content, (_is_advisorkhoj_table, _is_advisorkhoj_alt_table)):
                 if len(cols) >= 2:
-                    holdings.append({
-                        'stock_name': cols[0].text.strip(),
-                        'sector': cols[1].text.strip() if len(cols) > 2 else 'Unknown',
-                        'percentage': float(re.findall(r'[\d.]+', cols[-1].text)[0]) if re.findall(r'[\d.]+', cols[-1].text) else 0.0
-                    })
+                    pct_match = _PCT_RE.search(cols[-1])
+                    holdings.append(Holding(
+                        stock_name=cols[0].strip(),
+                        sector=cols[1].strip() if len(cols) > 2 else 'Unknown',
+                        percentage=float(pct_match.group()) if pct_match else 0.0
+                    ))
                     
             return holdings
             
         except Exception as e:
             logger.warning(f"Failed to get AdvisorKhoj portfolio for {fund_name}: {e}")
-            return []
-            
-    def create_sample_holdings(self, fund: Dict) -> List[Dict]:
-        """Create realistic sample holdings based on fund category"""
-        category = fund.get('category', '')
-        subcategory = fund.get('subcategory', '')
-        
-        # Common stocks by category
-        holdings_templates = {
-            'Equity': {
-                'Large Cap': [
-                    ('Reliance Industries', 'Energy', 8.5),
-                    ('HDFC Bank', 'Banking', 7.2),
-                    ('Infosys', 'IT', 6.8),
-                    ('ICICI Bank', 'Banking', 6.5),
-                    ('TCS', 'IT', 5.9),
-                    ('Bharti Airtel', 'Telecom', 4.8),
-                    ('ITC', 'FMCG', 4.2),
-                    ('Kotak Bank', 'Banking', 3.9),
-                    ('L&T', 'Engineering', 3.5),
-                    ('HUL', 'FMCG', 3.2)
-                ],
-                'Mid Cap': [
-                    ('Voltas', 'Consumer Durables', 5.2),
-                    ('Tata Power', 'Power', 4.8),
-                    ('Godrej Properties', 'Real Estate', 4.5),
-                    ('Indian Hotels', 'Hotels', 4.2),
-                    ('Jubilant FoodWorks', 'FMCG', 3.9),
-                    ('Page Industries', 'Textiles', 3.6),
-                    ('Apollo Hospitals', 'Healthcare', 3.4),
-                    ('Crompton Greaves', 'Consumer Durables', 3.2),
-                    ('Escorts', 'Auto', 3.0),
-                    ('Petronet LNG', 'Energy', 2.8)
-                ],
-                'Small Cap': [
-                    ('Navin Fluorine', 'Chemicals', 3.8),
-                    ('Alkyl Amines', 'Chemicals', 3.5),
-                    ('Caplin Point', 'Pharma', 3.2),
-                    ('Sudarshan Chemical', 'Chemicals', 3.0),
-                    ('Galaxy Surfactants', 'Chemicals', 2.8),
-                    ('Garware Technical', 'Textiles', 2.6),
-                    ('KPIT Technologies', 'IT', 2.5),
-                    ('Carborundum Universal', 'Industrial', 2.4),
-                    ('Suprajit Engineering', 'Auto Ancillary', 2.2),
-                    ('Vinati Organics', 'Chemicals', 2.0)
-                ]
-            },
-            'Debt': {
-                'default': [
-                    ('Govt Securities', 'Government', 25.5),
-                    ('State Development Loans', 'Government', 18.2),
-                    ('Corporate Bonds - AAA', 'Corporate', 15.8),
-                    ('Corporate Bonds - AA+', 'Corporate', 12.5),
-                    ('Commercial Papers', 'Money Market', 8.5),
-                    ('Treasury Bills', 'Government', 7.2),
-                    ('Bank FDs', 'Banking', 5.8),
-                    ('PSU Bonds', 'PSU', 4.5),
-                    ('Cash & Equivalents', 'Cash', 2.0)
-                ]
-            },
-            'Hybrid': {
-                'default': [
-                    ('HDFC Bank', 'Banking', 5.5),
-                    ('Infosys', 'IT', 4.8),
-                    ('Govt Securities', 'Government', 15.2),
-                    ('Corporate Bonds - AAA', 'Corporate', 12.5),
-                    ('Reliance Industries', 'Energy', 4.2),
-                    ('ICICI Bank', 'Banking', 3.8),
-                    ('TCS', 'IT', 3.5),
-                    ('State Development Loans', 'Government', 8.5),
-                    ('Bharti Airtel', 'Telecom', 3.0),
-                    ('Commercial Papers', 'Money Market', 5.0)
-                ]
-            }
-        }
-        
-        # Get template based on category
-        if category == 'Equity':
-            template = holdings_templates['Equity'].get(subcategory, holdings_templates['Equity']['Large Cap'])
-        elif category == 'Debt':
-            template = holdings_templates['Debt']['default']
-        elif category == 'Hybrid':
-            template = holdings_templates['Hybrid']['default']
-        else:
-            template = holdings_templates['Equity']['Large Cap']
-            
-        # Add some randomness to percentages
-        holdings = []
-        for stock_name, sector, base_pct in template:
-            # Add +/- 20% variation
-            pct = round(base_pct * (0.8 + 0.4 * (hash(fund['fund_name'] + stock_name) % 100) / 100), 2)
-            holdings.append({
-                'stock_name': stock_name,
-                'sector': sector,
-                'percentage': pct
-            })
-            
-        return holdings
+            return None
             
     def collect_holdings_for_funds(self, limit: int = 100):
         """Collect holdings for a batch of funds"""
-        cursor = self.db_conn.cursor()
+        # Stream funds that don't have holdings yet straight into fund dicts through
+        # a server-side cursor; it is drained and closed before any insert commits.
+        # The anti-join probes idx_portfolio_holdings_fund_stock (fund_id, stock_name)
+        with self.db_conn.cursor(name='funds_needing_holdings') as funds_cursor:
+            funds_cursor.itersize = 200
+            funds_cursor.execute("""
+                SELECT f.id, f.scheme_code, f.fund_name, f.category, f.subcategory
+                FROM funds f
+                WHERE NOT EXISTS (SELECT 1 FROM portfolio_holdings ph WHERE ph.fund_id = f.id)
+                ORDER BY f.id
+                LIMIT %s
+            """, (limit,))
+            
+            funds = [
+                {
+                    'id': fund_row[0],
+                    'scheme_code': fund_row[1],
+                    'fund_name': fund_row[2],
+                    'category': fund_row[3],
+                    'subcategory': fund_row[4]
+                }
+                for fund_row in funds_cursor
+            ]
+            
+        logger.info(f"Processing {len(funds)} funds for portfolio holdings...")
         
-        # Get funds that don't have holdings yet
-        cursor.execute("""
-            SELECT DISTINCT f.id, f.scheme_code, f.fund_name, f.category, f.subcategory
-            FROM funds f
-            LEFT JOIN portfolio_holdings ph ON f.id = ph.fund_id
-            WHERE ph.fund_id IS NULL
-            ORDER BY f.id
-            LIMIT %s
-        """, (limit,))
+        cursor = self.db_conn.cursor()
+        return asyncio.run(self._collect(cursor, funds))
         
-        funds = cursor.fetchall()
-        logger.info(f"Processing {len(funds)} funds for portfolio holdings...")
+    def fetch_holdings(self, fund: Dict) -> Optional[List[Holding]]:
+        """Get real holdings from AMFI, else AdvisorKhoj; empty/None if neither has them"""
+        holdings = self._scrape('amfi', fund['fund_name'], self.get_amfi_portfolio)
+        if not holdings:
+            holdings = self._scrape('advisorkhoj', fund['fund_name'], self.get_advisorkhoj_portfolio)
+        return holdings
         
+    async def _collect(self, cursor, funds: List[Dict]) -> int:
+        """Fetch funds concurrently (blocking HTTP in worker threads) and insert as they finish"""
+        # Worker threads share self.session; size the pool to the fetch concurrency
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='portfolio-fetch')
+        )
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        today = date.today()
         count = 0
-        for fund_row in funds:
-            fund = {
-                'id': fund_row[0],
-                'scheme_code': fund_row[1],
-                'fund_name': fund_row[2],
-                'category': fund_row[3],
-                'subcategory': fund_row[4]
-            }
-            
-            # Try to get real holdings from sources
-            holdings = self.get_amfi_portfolio(fund['fund_name'])
-            if not holdings:
-                holdings = self.get_advisorkhoj_portfolio(fund['fund_name'])
-                
-            # If no real data found, create realistic sample holdings
-            if not holdings:
-                holdings = self.create_sample_holdings(fund)
-                
-            # Insert holdings into database
-            if holdings:
-                batch_data = []
-                for i, holding in enumerate(holdings[:10]):  # Top 10 holdings
-                    batch_data.append((
-                        fund['id'],
-                        holding['stock_name'],
-                        holding.get('sector', 'Unknown'),
-                        holding['percentage'],
-                        date.today()
-                    ))
-                    
-                cursor.executemany("""
-                    INSERT INTO portfolio_holdings 
-                    (fund_id, stock_name, sector, holding_percent, holding_date)
-                    VALUES (%s, %s, %s, %s, %s)
-                    ON CONFLICT DO NOTHING
-                """, batch_data)
-                
-                count += cursor.rowcount
-                self.db_conn.commit()
-                
+        funds_done = 0
+        sample_funds = []
+        
+        async def process(fund):
+            nonlocal count, funds_done
+            async with semaphore:
+                holdings = await asyncio.to_thread(self.fetch_holdings, fund)
+                # Back on the event loop thread: the DB connection is only used from here
+                if holdings:
+                    count += self.insert_holdings(cursor, fund, holdings, today)
+                else:
+                    sample_funds.append(fund)
+                funds_done += 1
+                # Commit every commit_every funds instead of once per fund
+                if funds_done % self.commit_every == 0:
+                    self.db_conn.commit()
                 if count % 10 == 0:
                     logger.info(f"Progress: {count} holdings records inserted")
-                    
-            time.sleep(self.rate_limit_delay)
-            
+                
+        await asyncio.gather(*(process(fund) for fund in funds))
+        
+        # If no real data found, create realistic sample holdings for all such funds at once
+        count += self.insert_sample_holdings(cursor, sample_funds, today)
+        self.db_conn.commit()
         return count
         
+    def insert_holdings(self, cursor, fund: Dict, holdings: List[Holding], holding_date: date) -> int:
+        """Insert a fund's top 10 holdings and return the number of rows written"""
+        if not holdings:
+            return 0
+            
+        batch_data = [
+            (fund['id'], holding.stock_name, holding.sector, holding.percentage, holding_date)
+            for holding in holdings[:10]  # Top 10 holdings
+        ]
+            
+        # One multi-row INSERT per fund instead of one statement per holding
+        execute_values(cursor, """
+            INSERT INTO portfolio_holdings 
+            (fund_id, stock_name, sector, holding_percent, holding_date)
+            VALUES %s
+            ON CONFLICT DO NOTHING
+        """, batch_data, page_size=len(batch_data))
+        
+        return cursor.rowcount
+        
+    def insert_sample_holdings(self, cursor, funds: List[Dict], holding_date: date) -> int:
+        """Generate category-template sample holdings for funds server-side in one INSERT ... SELECT"""
+        if not funds:
+            return 0
+            
+        template_ids, stock_names, sectors, base_pcts = _SAMPLE_TEMPLATE_COLUMNS
+        # Percentages vary +/- 20% around the template, seeded by hashtext(fund || stock)
+        # so a fund gets the same sample holdings on every run
+        cursor.execute("""
+            INSERT INTO portfolio_holdings 
+            (fund_id, stock_name, sector, holding_percent, holding_date)
+            SELECT 
+                f.fund_id,
+                t.stock_name,
+                t.sector,
+                ROUND(t.base_pct * (0.8 + 0.4 * ((hashtext(f.fund_name || t.stock_name) & 2147483647) %% 100) / 100.0), 2),
+                %s
+            FROM unnest(%s::int[], %s::text[], %s::int[]) AS f(fund_id, fund_name, template_id)
+            JOIN unnest(%s::int[], %s::text[], %s::text[], %s::numeric[])
+                AS t(template_id, stock_name, sector, base_pct)
+                ON t.template_id = f.template_id
+            ON CONFLICT DO NOTHING
+        """, (
+            holding_date,
+            [fund['id'] for fund in funds],
+            [fund['fund_name'] for fund in funds],
+            [_sample_template_id(fund) for fund in funds],
+            list(template_ids), list(stock_names), list(sectors), list(base_pcts)
+        ))
+        return cursor.rowcount
+        
     def run(self, batch_size: int = 100):
         """Run the portfolio holdings collector"""
         logger.info("\n📊 Portfolio Holdings Collector Started")
@@ -317,6 +581,8 @@ class PortfolioHoldingsCollector:
             
             logger.info(f"\n✅ Portfolio holdings collection completed!")
             logger.info(f"Total holdings records inserted: {total_records}")
+            logger.info(f"Page cache: {self.cache_stats['hits']} hits, {self.cache_stats['misses']} misses, "
+                        f"{self.cache_stats['skipped']} skipped as known misses")
             
             # Print JSON result
             result = {
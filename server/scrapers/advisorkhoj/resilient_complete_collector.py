@@ -4,18 +4,20 @@ Resilient Complete Data Collector
 Handles errors gracefully and ensures all funds get data
 """
 
-import os
+import io
+import csv
 import json
 import time
 import logging
-from datetime import date
-import psycopg2
-from urllib.parse import urlparse
-from dotenv import load_dotenv
+from datetime import date, timedelta
+from types import MappingProxyType
 import random
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import yfinance as yf
-
-load_dotenv()
+from psycopg2.extras import execute_values
+from _db import connection, get_pool
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,28 +25,110 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# AMC AUM base values
+AMC_BASES = MappingProxyType({
+    'SBI Mutual Fund': 725000,
+    'HDFC Mutual Fund': 520000,
+    'ICICI Prudential Mutual Fund': 485000,
+    'Aditya Birla Sun Life Mutual Fund': 345000,
+    'Kotak Mutual Fund': 315000,
+    'Axis Mutual Fund': 295000,
+    'Nippon India Mutual Fund': 145000,
+    'DSP Mutual Fund': 185000
+})
+
+# Sample holdings universe
+EQUITY_STOCKS = (
+    ('Reliance Industries', 'Energy'),
+    ('HDFC Bank', 'Banking'),
+    ('Infosys', 'IT'),
+    ('ICICI Bank', 'Banking'),
+    ('TCS', 'IT'),
+    ('Bharti Airtel', 'Telecom'),
+    ('ITC', 'FMCG'),
+    ('Kotak Bank', 'Banking'),
+    ('L&T', 'Engineering'),
+    ('HUL', 'FMCG'),
+    ('Axis Bank', 'Banking'),
+    ('SBI', 'Banking'),
+    ('Maruti Suzuki', 'Auto'),
+    ('Asian Paints', 'Consumer'),
+    ('Wipro', 'IT')
+)
+
+DEBT_STOCKS = (
+    ('Government Securities', 'Government'),
+    ('State Development Loans', 'Government'),
+    ('AAA Corporate Bonds', 'Corporate'),
+    ('AA+ Corporate Bonds', 'Corporate'),
+    ('Commercial Papers', 'Money Market'),
+    ('Treasury Bills', 'Government')
+)
+
+def _stock_pool(stocks, count):
+    """(names, sectors, count) for drawing `count` of `stocks` per fund"""
+    return (
+        np.array([stock for stock, _ in stocks]),
+        np.array([sector for _, sector in stocks]),
+        min(count, len(stocks))
+    )
+
+# Pools each fund type draws its holdings from
+HOLDING_POOLS = MappingProxyType({
+    'Equity': (_stock_pool(EQUITY_STOCKS, 10),),
+    'Debt': (_stock_pool(DEBT_STOCKS, len(DEBT_STOCKS)),),
+    'Hybrid': (_stock_pool(EQUITY_STOCKS, 5), _stock_pool(DEBT_STOCKS, 3))
+})
+
+# Benchmark per (category, subcategory); None is the category-wide fallback
+BENCHMARK_MAP = MappingProxyType({
+    ('Equity', 'Large Cap'): 'NIFTY 50',
+    ('Equity', 'Mid Cap'): 'NIFTY MIDCAP 100',
+    ('Equity', 'Small Cap'): 'NIFTY SMALLCAP 100',
+    ('Equity', 'Multi Cap'): 'NIFTY 500',
+    ('Equity', 'ELSS'): 'NIFTY 500',
+    ('Debt', None): 'NIFTY AAA CORPORATE BOND',
+    ('Hybrid', None): 'NIFTY 50'
+})
+
+# Index name -> Yahoo Finance ticker
+INDEX_TICKERS = MappingProxyType({
+    'NIFTY 50': '^NSEI',
+    'SENSEX': '^BSESN',
+    'NIFTY BANK': '^NSEBANK',
+    'NIFTY IT': '^CNXIT',
+    'NIFTY MIDCAP 100': '^NSEMDCP100',
+    'NIFTY SMALLCAP 100': '^NSESMCP100'
+})
+
+def _random_holdings(rng, fund_ids, pools):
+    """Pick holdings for each fund from HOLDING_POOLS entries and split 100% across them
+    
+    Returns flat fund_id, stock, sector and percent arrays, one entry per holding.
+    """
+    n = len(fund_ids)
+    names, sectors = [], []
+    for pool_names, pool_sectors, count in pools:
+        # First `count` columns of a random permutation per row = sample without replacement
+        picks = rng.random((n, len(pool_names))).argsort(axis=1)[:, :count]
+        names.append(pool_names[picks])
+        sectors.append(pool_sectors[picks])
+    names = np.hstack(names)
+    sectors = np.hstack(sectors)
+    
+    k = names.shape[1]
+    pcts = (rng.dirichlet(np.ones(k), size=n) * 100).round(2)
+    # Absorb the rounding error in the last holding so each fund sums to exactly 100
+    pcts[:, -1] = (100 - pcts[:, :-1].sum(axis=1)).round(2)
+    return np.repeat(fund_ids, k), names.ravel(), sectors.ravel(), pcts.ravel()
+
 class ResilientCompleteCollector:
     """Resilient collector that ensures all funds get data"""
     
-    def __init__(self):
-        self.db_conn = None
-        
     def connect_db(self):
-        """Connect to PostgreSQL database"""
+        """Open the shared connection pool"""
         try:
-            db_url = os.getenv('DATABASE_URL')
-            parsed = urlparse(db_url)
-            
-            self.db_conn = psycopg2.connect(
-                host=parsed.hostname,
-                port=parsed.port,
-                database=parsed.path[1:],
-                user=parsed.username,
-                password=parsed.password,
-                sslmode='require'
-            )
-            self.db_conn.autocommit = True  # Auto-commit to avoid transaction issues
-            
+            get_pool()
             logger.info("✅ Connected to database")
             return True
             
@@ -52,10 +136,19 @@ class ResilientCompleteCollector:
             logger.error(f"❌ Database connection failed: {e}")
             return False
             
-    def complete_all_aum_data(self):
+    def _run_phase(self, phase):
+        """Run one phase on its own pooled connection so phases can overlap"""
+        with connection() as conn:
+            with conn.cursor() as cursor:
+                # Filler rows only; don't wait on the WAL fsync for each phase commit.
+                # Session-level, undone when the connection goes back to the pool
+                cursor.execute("SET synchronous_commit = OFF")
+            return phase(conn)
+            
+    def complete_all_aum_data(self, conn):
         """Complete AUM data for all remaining funds"""
         logger.info("💰 Completing AUM data for remaining funds...")
-        cursor = self.db_conn.cursor()
+        cursor = conn.cursor()
         
         try:
             # Get count of funds without AUM
@@ -74,86 +167,50 @@ class ResilientCompleteCollector:
                 logger.info("✅ All funds already have AUM data!")
                 return 0
             
-            # Process in small batches
-            batch_size = 100
-            total_added = 0
-            
-            while True:
-                cursor.execute("""
-                    SELECT f.id, f.scheme_code, f.fund_name, f.amc_name, f.category, f.subcategory
-                    FROM funds f
-                    WHERE NOT EXISTS (
-                        SELECT 1 FROM aum_analytics a 
-                        WHERE a.fund_name = f.fund_name
-                    )
-                    LIMIT %s
-                """, (batch_size,))
-                
-                funds = cursor.fetchall()
-                if not funds:
-                    break
-                
-                # AMC AUM base values
-                amc_bases = {
-                    'SBI Mutual Fund': 725000,
-                    'HDFC Mutual Fund': 520000,
-                    'ICICI Prudential Mutual Fund': 485000,
-                    'Aditya Birla Sun Life Mutual Fund': 345000,
-                    'Kotak Mutual Fund': 315000,
-                    'Axis Mutual Fund': 295000,
-                    'Nippon India Mutual Fund': 145000,
-                    'DSP Mutual Fund': 185000
-                }
-                
-                for row in funds:
-                    fund_id, scheme_code, fund_name, amc_name, category, subcategory = row
-                    
-                    # Calculate fund AUM
-                    amc_base = amc_bases.get(amc_name, 25000)
-                    
-                    if category == 'Equity' and subcategory:
-                        if 'Large Cap' in subcategory:
-                            fund_aum = amc_base * random.uniform(0.10, 0.18)
-                        elif 'Mid Cap' in subcategory:
-                            fund_aum = amc_base * random.uniform(0.05, 0.10)
-                        elif 'Small Cap' in subcategory:
-                            fund_aum = amc_base * random.uniform(0.03, 0.07)
-                        else:
-                            fund_aum = amc_base * random.uniform(0.02, 0.05)
-                    elif category == 'Debt':
-                        fund_aum = amc_base * random.uniform(0.08, 0.15)
-                    else:
-                        fund_aum = amc_base * random.uniform(0.03, 0.08)
-                    
-                    try:
-                        cursor.execute("""
-                            INSERT INTO aum_analytics 
-                            (amc_name, fund_name, aum_crores, total_aum_crores, 
-                             category, data_date, source)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s)
-                            ON CONFLICT DO NOTHING
-                        """, (
-                            amc_name, fund_name, round(fund_aum, 2), amc_base,
-                            category, date.today(), 'resilient_collector'
-                        ))
-                        total_added += cursor.rowcount
-                    except Exception as e:
-                        logger.warning(f"Failed to insert AUM for {fund_name}: {e}")
-                        continue
-                
-                logger.info(f"Progress: {total_added} AUM records added")
+            # Generate every missing fund's AUM in one INSERT ... SELECT: AMC base
+            # (default 25000) times a random share that depends on the fund type
+            amc_names, amc_bases = zip(*AMC_BASES.items())
+            cursor.execute("""
+                INSERT INTO aum_analytics 
+                (amc_name, fund_name, aum_crores, total_aum_crores, 
+                 category, data_date, source)
+                SELECT 
+                    f.amc_name,
+                    f.fund_name,
+                    ROUND(COALESCE(b.amc_base, 25000) * CASE
+                        WHEN f.category = 'Equity' AND f.subcategory LIKE '%%Large Cap%%' THEN 0.10 + random() * 0.08
+                        WHEN f.category = 'Equity' AND f.subcategory LIKE '%%Mid Cap%%' THEN 0.05 + random() * 0.05
+                        WHEN f.category = 'Equity' AND f.subcategory LIKE '%%Small Cap%%' THEN 0.03 + random() * 0.04
+                        WHEN f.category = 'Equity' AND f.subcategory <> '' THEN 0.02 + random() * 0.03
+                        WHEN f.category = 'Debt' THEN 0.08 + random() * 0.07
+                        ELSE 0.03 + random() * 0.05
+                    END::numeric, 2),
+                    COALESCE(b.amc_base, 25000),
+                    f.category,
+                    CURRENT_DATE,
+                    'resilient_collector'
+                FROM funds f
+                LEFT JOIN unnest(%s::text[], %s::numeric[]) AS b(amc_name, amc_base)
+                    ON b.amc_name = f.amc_name
+                LEFT JOIN aum_analytics a ON a.fund_name = f.fund_name
+                WHERE a.fund_name IS NULL
+                ON CONFLICT DO NOTHING
+            """, (list(amc_names), list(amc_bases)))
+            total_added = cursor.rowcount
+            conn.commit()
             
             logger.info(f"✅ Completed AUM data: {total_added} new records")
             return total_added
             
         except Exception as e:
+            conn.rollback()
             logger.error(f"AUM collection error: {e}")
             return 0
             
-    def complete_all_holdings(self):
+    def complete_all_holdings(self, conn):
         """Complete portfolio holdings for all funds"""
         logger.info("📊 Completing portfolio holdings...")
-        cursor = self.db_conn.cursor()
+        cursor = conn.cursor()
         
         try:
             # Get count of funds without holdings
@@ -172,101 +229,85 @@ class ResilientCompleteCollector:
                 logger.info("✅ All funds already have holdings!")
                 return 0
             
-            # Stock templates
-            stocks = {
-                'Equity': [
-                    ('Reliance Industries', 'Energy'),
-                    ('HDFC Bank', 'Banking'),
-                    ('Infosys', 'IT'),
-                    ('ICICI Bank', 'Banking'),
-                    ('TCS', 'IT'),
-                    ('Bharti Airtel', 'Telecom'),
-                    ('ITC', 'FMCG'),
-                    ('Kotak Bank', 'Banking'),
-                    ('L&T', 'Engineering'),
-                    ('HUL', 'FMCG'),
-                    ('Axis Bank', 'Banking'),
-                    ('SBI', 'Banking'),
-                    ('Maruti Suzuki', 'Auto'),
-                    ('Asian Paints', 'Consumer'),
-                    ('Wipro', 'IT')
-                ],
-                'Debt': [
-                    ('Government Securities', 'Government'),
-                    ('State Development Loans', 'Government'),
-                    ('AAA Corporate Bonds', 'Corporate'),
-                    ('AA+ Corporate Bonds', 'Corporate'),
-                    ('Commercial Papers', 'Money Market'),
-                    ('Treasury Bills', 'Government')
-                ]
-            }
+            batch_size = 1000
+            staged = 0
+            today = date.today()
+            rng = np.random.default_rng()
             
-            batch_size = 50
-            total_added = 0
+            # Generated rows are COPYed into a temp table and moved over in one
+            # INSERT at the end, which keeps the ON CONFLICT DO NOTHING semantics
+            cursor.execute("""
+                CREATE TEMP TABLE tmp_portfolio_holdings 
+                (LIKE portfolio_holdings INCLUDING DEFAULTS)
+                ON COMMIT DROP
+            """)
+            
+            # Snapshot the work list once and stream it, instead of re-running the
+            # anti-join per batch; the cursor closes with the transaction
+            pending = conn.cursor(name='pending_holdings')
+            pending.execute("""
+                SELECT f.id, f.fund_name, f.category, f.subcategory
+                FROM funds f
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM portfolio_holdings ph 
+                    WHERE ph.fund_id = f.id
+                )
+                ORDER BY f.id
+            """)
             
             while True:
-                cursor.execute("""
-                    SELECT f.id, f.fund_name, f.category, f.subcategory
-                    FROM funds f
-                    WHERE NOT EXISTS (
-                        SELECT 1 FROM portfolio_holdings ph 
-                        WHERE ph.fund_id = f.id
-                    )
-                    LIMIT %s
-                """, (batch_size,))
-                
-                funds = cursor.fetchall()
+                funds = pending.fetchmany(batch_size)
                 if not funds:
                     break
                 
+                # Group the batch by fund type and generate each group's holdings in
+                # a few array operations instead of per-fund sampling
+                fund_ids = {}
                 for fund_id, fund_name, category, subcategory in funds:
-                    # Select appropriate holdings
-                    if category == 'Equity':
-                        selected = random.sample(stocks['Equity'], min(10, len(stocks['Equity'])))
-                    elif category == 'Debt':
-                        selected = stocks['Debt']
-                    else:  # Hybrid
-                        selected = random.sample(stocks['Equity'], 5) + random.sample(stocks['Debt'], 3)
-                    
-                    # Distribute percentages
-                    remaining_pct = 100.0
-                    for i, (stock, sector) in enumerate(selected):
-                        if i < len(selected) - 1:
-                            pct = round(remaining_pct * random.uniform(0.08, 0.15), 2)
-                        else:
-                            pct = round(remaining_pct, 2)
-                        
-                        try:
-                            cursor.execute("""
-                                INSERT INTO portfolio_holdings 
-                                (fund_id, stock_name, sector, holding_percent, holding_date)
-                                VALUES (%s, %s, %s, %s, %s)
-                                ON CONFLICT DO NOTHING
-                            """, (fund_id, stock, sector, pct, date.today()))
-                            total_added += cursor.rowcount
-                        except Exception as e:
-                            logger.warning(f"Failed to insert holding: {e}")
-                            continue
-                        
-                        remaining_pct -= pct
+                    kind = category if category in ('Equity', 'Debt') else 'Hybrid'
+                    fund_ids.setdefault(kind, []).append(fund_id)
+                
+                buf = io.StringIO()
+                writer = csv.writer(buf)
+                for kind, ids in fund_ids.items():
+                    columns = _random_holdings(rng, np.array(ids), HOLDING_POOLS[kind])
+                    writer.writerows(zip(*(column.tolist() for column in columns), repeat(today)))
+                    staged += len(columns[0])
+                buf.seek(0)
+                cursor.copy_expert("""
+                    COPY tmp_portfolio_holdings 
+                    (fund_id, stock_name, sector, holding_percent, holding_date)
+                    FROM STDIN WITH CSV
+                """, buf)
                 
-                logger.info(f"Progress: {total_added} holdings added")
+                logger.info(f"Progress: {staged} holdings staged")
+            
+            cursor.execute("""
+                INSERT INTO portfolio_holdings 
+                (fund_id, stock_name, sector, holding_percent, holding_date)
+                SELECT fund_id, stock_name, sector, holding_percent, holding_date
+                FROM tmp_portfolio_holdings
+                ON CONFLICT DO NOTHING
+            """)
+            total_added = cursor.rowcount
+            conn.commit()
             
             logger.info(f"✅ Completed holdings: {total_added} new records")
             return total_added
             
         except Exception as e:
+            conn.rollback()
             logger.error(f"Holdings collection error: {e}")
             return 0
             
-    def complete_benchmarks(self):
+    def complete_benchmarks(self, conn):
         """Assign benchmarks to all funds"""
         logger.info("🎯 Completing benchmark assignments...")
-        cursor = self.db_conn.cursor()
+        cursor = conn.cursor()
         
         try:
             # First, ensure we have benchmark data
-            self.collect_basic_benchmarks()
+            self.collect_basic_benchmarks(conn)
             
             # Get funds without benchmarks
             cursor.execute("""
@@ -281,100 +322,109 @@ class ResilientCompleteCollector:
                 logger.info("✅ All funds already have benchmarks!")
                 return 0
             
-            # Benchmark mapping
-            benchmark_map = {
-                ('Equity', 'Large Cap'): 'NIFTY 50',
-                ('Equity', 'Mid Cap'): 'NIFTY MIDCAP 100',
-                ('Equity', 'Small Cap'): 'NIFTY SMALLCAP 100',
-                ('Equity', 'Multi Cap'): 'NIFTY 500',
-                ('Equity', 'ELSS'): 'NIFTY 500',
-                ('Debt', None): 'NIFTY AAA CORPORATE BOND',
-                ('Hybrid', None): 'NIFTY 50'
-            }
-            
-            # Update funds
+            # Update all funds in one statement: exact (category, subcategory) match,
+            # then the category-wide entry, then NIFTY 50
+            categories, subcategories, benchmarks = zip(*(
+                (category, subcategory, benchmark)
+                for (category, subcategory), benchmark in BENCHMARK_MAP.items()
+            ))
             cursor.execute("""
-                SELECT id, fund_name, category, subcategory
-                FROM funds
-                WHERE benchmark_name IS NULL OR benchmark_name = ''
-            """)
-            
-            funds = cursor.fetchall()
-            total_updated = 0
-            
-            for fund_id, fund_name, category, subcategory in funds:
-                # Determine benchmark
-                benchmark = benchmark_map.get((category, subcategory))
-                if not benchmark:
-                    benchmark = benchmark_map.get((category, None), 'NIFTY 50')
-                
-                try:
-                    cursor.execute("""
-                        UPDATE funds
-                        SET benchmark_name = %s
-                        WHERE id = %s
-                    """, (benchmark, fund_id))
-                    total_updated += cursor.rowcount
-                except Exception as e:
-                    logger.warning(f"Failed to update benchmark: {e}")
-                    continue
+                WITH benchmark_map AS (
+                    SELECT * FROM unnest(%s::text[], %s::text[], %s::text[])
+                        AS m(category, subcategory, benchmark)
+                )
+                UPDATE funds f
+                SET benchmark_name = COALESCE(
+                    (SELECT m.benchmark FROM benchmark_map m
+                     WHERE m.category = f.category AND m.subcategory = f.subcategory),
+                    (SELECT m.benchmark FROM benchmark_map m
+                     WHERE m.category = f.category AND m.subcategory IS NULL),
+                    'NIFTY 50'
+                )
+                WHERE f.benchmark_name IS NULL OR f.benchmark_name = ''
+            """, (list(categories), list(subcategories), list(benchmarks)))
+            total_updated = cursor.rowcount
+            conn.commit()
             
             logger.info(f"✅ Updated {total_updated} fund benchmarks")
             return total_updated
             
         except Exception as e:
+            conn.rollback()
             logger.error(f"Benchmark assignment error: {e}")
             return 0
             
-    def collect_basic_benchmarks(self):
+    def collect_basic_benchmarks(self, conn):
         """Collect basic benchmark data"""
         logger.info("📈 Collecting basic benchmark data...")
-        cursor = self.db_conn.cursor()
+        cursor = conn.cursor()
         
-        benchmarks = {
-            'NIFTY 50': '^NSEI',
-            'SENSEX': '^BSESN',
-            'NIFTY BANK': '^NSEBANK',
-            'NIFTY IT': '^CNXIT',
-            'NIFTY MIDCAP 100': '^NSEMDCP100',
-            'NIFTY SMALLCAP 100': '^NSESMCP100'
+        # Skip indices that already have yesterday's (or today's) close, so quick
+        # re-runs don't hit Yahoo again
+        cursor.execute("""
+            SELECT index_name, MAX(index_date)
+            FROM market_indices
+            WHERE index_name = ANY(%s)
+            GROUP BY index_name
+        """, (list(INDEX_TICKERS),))
+        latest = dict(cursor.fetchall())
+        cutoff = date.today() - timedelta(days=1)
+        stale = {
+            name: ticker for name, ticker in INDEX_TICKERS.items()
+            if latest.get(name) is None or latest[name] < cutoff
         }
+        if not stale:
+            logger.info("✅ Benchmark data already current")
+            return 0
         
-        count = 0
-        for name, ticker in benchmarks.items():
+        # Fetch all tickers side by side; inserts stay on this thread's connection
+        with ThreadPoolExecutor(max_workers=len(stale)) as executor:
+            futures = {
+                name: executor.submit(self._fetch_history, ticker)
+                for name, ticker in stale.items()
+            }
+        
+        rows = []
+        for name, future in futures.items():
             try:
-                stock = yf.Ticker(ticker)
-                hist = stock.history(period="1mo")
-                
-                if not hist.empty:
-                    for idx, row in hist.iterrows():
-                        try:
-                            cursor.execute("""
-                                INSERT INTO market_indices 
-                                (index_name, close_value, open_value, high_value, 
-                                 low_value, volume, index_date)
-                                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                                ON CONFLICT (index_name, index_date) DO UPDATE
-                                SET close_value = EXCLUDED.close_value
-                            """, (
-                                name, float(row['Close']), float(row['Open']),
-                                float(row['High']), float(row['Low']),
-                                int(row.get('Volume', 0)), idx.date()
-                            ))
-                            count += cursor.rowcount
-                        except Exception as e:
-                            continue
-                            
+                hist = future.result()
+                rows.extend(
+                    (name, float(r.Close), float(r.Open), float(r.High), float(r.Low),
+                     int(getattr(r, 'Volume', 0) or 0), r.Index.date())
+                    for r in hist.itertuples()
+                )
                 logger.info(f"✅ Added data for {name}")
-                time.sleep(0.5)
                 
             except Exception as e:
                 logger.warning(f"Failed to get {name}: {e}")
                 continue
         
+        # All tickers' rows in one round trip
+        count = 0
+        if rows:
+            execute_values(cursor, """
+                INSERT INTO market_indices 
+                (index_name, close_value, open_value, high_value, 
+                 low_value, volume, index_date)
+                VALUES %s
+                ON CONFLICT (index_name, index_date) DO UPDATE
+                SET close_value = EXCLUDED.close_value
+            """, rows, page_size=len(rows))
+            count = cursor.rowcount
+        
         logger.info(f"✅ Collected {count} benchmark records")
         return count
         
+    def _fetch_history(self, ticker, attempts=3):
+        """One month of daily history, retried with exponential backoff and jitter"""
+        for attempt in range(attempts):
+            try:
+                return yf.Ticker(ticker).history(period="1mo")
+            except Exception:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(2 ** attempt + random.random())
+        
     def run(self):
         """Run the resilient complete collector"""
         logger.info("\n🚀 Resilient Complete Collector Started")
@@ -390,34 +440,38 @@ class ResilientCompleteCollector:
                 'benchmark_updates': 0
             }
             
-            # 1. Complete AUM data
-            logger.info("\n💰 Phase 1: Complete AUM Data")
-            results['aum_records'] = self.complete_all_aum_data()
-            
-            # 2. Complete holdings
-            logger.info("\n📊 Phase 2: Complete Holdings")
-            results['holdings_records'] = self.complete_all_holdings()
-            
-            # 3. Complete benchmarks
-            logger.info("\n🎯 Phase 3: Complete Benchmarks")
-            results['benchmark_updates'] = self.complete_benchmarks()
-            
-            # Get final stats
-            cursor = self.db_conn.cursor()
-            stats = {}
-            
-            queries = {
-                'total_funds': "SELECT COUNT(*) FROM funds",
-                'funds_with_aum': "SELECT COUNT(DISTINCT fund_name) FROM aum_analytics",
-                'funds_with_holdings': "SELECT COUNT(DISTINCT fund_id) FROM portfolio_holdings",
-                'funds_with_benchmarks': "SELECT COUNT(*) FROM funds WHERE benchmark_name IS NOT NULL",
-                'total_holdings': "SELECT COUNT(*) FROM portfolio_holdings",
-                'unique_benchmarks': "SELECT COUNT(DISTINCT index_name) FROM market_indices"
+            # The phases write disjoint tables, so run them side by side,
+            # each on its own connection
+            phases = {
+                'aum_records': self.complete_all_aum_data,
+                'holdings_records': self.complete_all_holdings,
+                'benchmark_updates': self.complete_benchmarks
             }
-            
-            for key, query in queries.items():
-                cursor.execute(query)
-                stats[key] = cursor.fetchone()[0]
+            logger.info("\n🚀 Phases 1-3: AUM data, holdings and benchmarks")
+            with ThreadPoolExecutor(max_workers=len(phases)) as executor:
+                futures = {key: executor.submit(self._run_phase, phase) for key, phase in phases.items()}
+            for key, future in futures.items():
+                results[key] = future.result()
+            
+            # Get final stats in one round trip, one scan per table
+            with connection() as conn, conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT f.total_funds, a.funds_with_aum, h.funds_with_holdings,
+                           f.funds_with_benchmarks, h.total_holdings, m.unique_benchmarks
+                    FROM (
+                        SELECT COUNT(*) AS total_funds,
+                               COUNT(*) FILTER (WHERE benchmark_name IS NOT NULL) AS funds_with_benchmarks
+                        FROM funds
+                    ) f,
+                    (SELECT COUNT(DISTINCT fund_name) AS funds_with_aum FROM aum_analytics) a,
+                    (
+                        SELECT COUNT(DISTINCT fund_id) AS funds_with_holdings,
+                               COUNT(*) AS total_holdings
+                        FROM portfolio_holdings
+                    ) h,
+                    (SELECT COUNT(DISTINCT index_name) AS unique_benchmarks FROM market_indices) m
+                """)
+                stats = dict(zip((column.name for column in cursor.description), cursor.fetchone()))
             
             # Calculate completion percentage
             completion = {
@@ -447,10 +501,6 @@ class ResilientCompleteCollector:
             import traceback
             traceback.print_exc()
             return {'success': False, 'error': str(e)}
-            
-        finally:
-            if self.db_conn:
-                self.db_conn.close()
                 
 
 if __name__ == "__main__":
@@ -5,18 +5,26 @@ Collects authentic data with zero synthetic contamination
 """
 
 import os
+import io
+import csv
 import sys
 import json
 import time
 import logging
 import glob
+import threading
+from contextlib import contextmanager
 from datetime import datetime, date
-from typing import Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree
 import pandas as pd
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import execute_values
 from urllib.parse import urlparse
 from dotenv import load_dotenv
 from selenium import webdriver
@@ -42,18 +50,117 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Separators and currency/percent signs dropped from numbers before float()
+_NUMBER_STRIP = str.maketrans('', '', ',₹%')
+_MISSING_NUMBERS = frozenset(('', '-', 'na'))
+
+# Data tables on the AUM and category-monitor pages
+def _is_aum_table(table) -> bool:
+    return 'table-bordered' in (table.get('class') or '').split()
+
+def _is_category_table(table) -> bool:
+    return table.get('id') == 'category-performance-table'
+
+_CELLS_XP = etree.XPath(".//td")
+
+# Manager profile cards, compiled once; the class tests match a single class
+# token the way BeautifulSoup's class filter does
+def _class_xpath(path: str, tag: str, css_class: str) -> etree.XPath:
+    return etree.XPath(
+        f"{path}{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')]"
+    )
+
+_MANAGER_PROFILE_XP = _class_xpath('//', 'div', 'manager-profile')
+_MANAGER_NAME_XP = _class_xpath('.//', 'h4', 'manager-name')
+_FUNDS_MANAGED_XP = _class_xpath('.//', 'span', 'funds-managed')
+_AUM_MANAGED_XP = _class_xpath('.//', 'span', 'aum-managed')
+
+def _first_text(xpath: etree.XPath, elem) -> str:
+    """Text of the first node xpath finds under elem (IndexError if none)"""
+    return ''.join(xpath(elem)[0].itertext())
+
+def _iter_table_rows(source, matches) -> Iterator[List[str]]:
+    """Yield the cell texts of each row of the first table accepted by `matches`,
+    skipping its header row.
+    
+    `source` is stream-parsed: rows are freed as soon as they are read and
+    parsing stops at the end of the table, so memory stays flat with page size.
+    """
+    target = None
+    seen = 0
+    
+    for _, elem in etree.iterparse(source, tag=('tr', 'table'), html=True, recover=True):
+        if elem.tag == 'table':
+            if elem is target:
+                break
+            elem.clear(keep_tail=True)
+            continue
+            
+        table = next(elem.iterancestors('table'), None)
+        if target is None and table is not None and matches(table):
+            target = table
+        if table is not None and table is target:
+            seen += 1
+            if seen > 1:
+                yield [''.join(td.itertext()) for td in _CELLS_XP(elem)]
+                
+        # Drop the row and any already-read siblings before it
+        elem.clear(keep_tail=True)
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+# Indian index names -> Yahoo Finance tickers
+YAHOO_TICKERS = MappingProxyType({
+    'Nifty 50 TRI': '^NSEI',
+    'Nifty 500 TRI': 'NIFTY500.NS',
+    'Nifty Bank TRI': '^NSEBANK',
+    'BSE Sensex': '^BSESN',
+    'Nifty Midcap 150 TRI': 'NIFTYMIDCAP150.NS',
+    'Nifty Smallcap 250 TRI': 'NIFTYSMALLCAP250.NS'
+})
+
+# Unique keys the scraper's inserts deduplicate on; tables without one take plain
+# INSERTs, since a bare ON CONFLICT DO NOTHING has nothing to match there.
+# portfolio_overlap rows only dedupe once _attach_scheme_codes has filled in both
+# codes; a pair whose names are not in funds keeps NULL codes, and NULLs never conflict
+CONFLICT_TARGETS = MappingProxyType({
+    'portfolio_overlap': '(fund1_scheme_code, fund2_scheme_code, analysis_date)',
+})
+
+def _conflict_clause(table_name: str) -> str:
+    target = CONFLICT_TARGETS.get(table_name)
+    return f"ON CONFLICT {target} DO NOTHING" if target else ""
+
 class AdvisorKhojScraper:
     """Scraper for AdvisorKhoj data with zero synthetic data policy"""
     
+    # chromedriver resolved by the first successful init_selenium, reused by later instances
+    _chromedriver_path: Optional[str] = None
+    # Chromium binary found by the first filesystem probe (None = not found)
+    _chromium_binary: Optional[str] = None
+    _chromium_probed = False
+    
     def __init__(self):
         self.base_url = "https://www.advisorkhoj.com"
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'CGMF-Models-Educational-Scraper/1.0 (Educational Use Only)'
         })
+        # Keep-alive pool sized for the concurrent scrapes, with retry/backoff on
+        # throttling and transient server errors
+        adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         self.db_conn = None
         self.driver = None
-        self.rate_limit_delay = 2.5  # seconds between requests
+        self.rate_limit_delay = 2.5  # seconds between requests to the same host
+        self._next_hit: Dict[str, float] = {}
+        self._throttle_lock = threading.Lock()
+        self.copy_threshold = 500  # rows per table above which saves go through COPY
         self.records_scraped = {
             'aum': 0,
             'overlap': 0,
@@ -78,6 +185,8 @@ class AdvisorKhojScraper:
                     password=os.getenv('DB_PASSWORD'),
                     port=os.getenv('DB_PORT', '5432')
                 )
+            # Saves run as one explicit transaction per scrape
+            self.db_conn.set_session(autocommit=False)
             logger.info("✅ Connected to CGMF database")
             return True
         except Exception as e:
@@ -95,50 +204,44 @@ class AdvisorKhojScraper:
             chrome_options.add_argument('--disable-blink-features=AutomationControlled')
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option('useAutomationExtension', False)
+            # Only the DOM is scraped: don't wait for sub-resources or fetch images
+            chrome_options.page_load_strategy = 'eager'
+            chrome_options.add_argument('--blink-settings=imagesEnabled=false')
             
-            # Try to find chromium binary
-            chromium_paths = [
-                '/usr/bin/chromium',
-                '/usr/bin/chromium-browser',
-                '/nix/store/*/bin/chromium',
-                'chromium'
-            ]
-            
-            chromium_binary = None
-            for path in chromium_paths:
-                if os.path.exists(path):
-                    chromium_binary = path
-                    break
-                elif '*' in path:
-                    import glob
-                    matches = glob.glob(path)
-                    if matches:
-                        chromium_binary = matches[0]
-                        break
-            
+            chromium_binary = self._find_chromium()
             if chromium_binary:
                 chrome_options.binary_location = chromium_binary
                 logger.info(f"Found chromium at: {chromium_binary}")
             
+            # Use a known chromedriver ($CHROMEDRIVER_PATH or one resolved earlier)
+            # before asking webdriver-manager, which resolves it again on every call
+            known_path = os.environ.get('CHROMEDRIVER_PATH') or AdvisorKhojScraper._chromedriver_path
+            # A pinned version skips webdriver-manager's latest-version lookup
+            driver_version = os.environ.get('CHROMEDRIVER_VERSION')
+            
             # Use ChromeDriver for Chromium
             try:
                 # Set page load timeout
+                driver_path = known_path or ChromeDriverManager(chrome_type="chromium", driver_version=driver_version).install()
                 self.driver = webdriver.Chrome(
-                    service=Service(ChromeDriverManager(chrome_type="chromium").install()),
+                    service=Service(driver_path),
                     options=chrome_options
                 )
                 self.driver.set_page_load_timeout(10)
             except:
                 try:
                     # Fallback to regular Chrome
+                    driver_path = ChromeDriverManager(driver_version=driver_version).install()
                     self.driver = webdriver.Chrome(
-                        service=Service(ChromeDriverManager().install()),
+                        service=Service(driver_path),
                         options=chrome_options
                     )
                     self.driver.set_page_load_timeout(10)
                 except Exception as e:
                     logger.warning(f"Chrome/Chromium not available: {e}")
                     return False
+                    
+            AdvisorKhojScraper._chromedriver_path = driver_path
                 
             logger.info("✅ Selenium WebDriver initialized")
             return True
@@ -146,6 +249,19 @@ class AdvisorKhojScraper:
             logger.error(f"❌ Selenium initialization failed: {e}")
             return False
             
+    @classmethod
+    def _find_chromium(cls) -> Optional[str]:
+        """Find the chromium binary once per process; later instances reuse the result"""
+        if not cls._chromium_probed:
+            # Try to find chromium binary: fixed paths first, then the Nix store
+            chromium_paths = ['/usr/bin/chromium', '/usr/bin/chromium-browser', 'chromium']
+            found = [path for path in chromium_paths[:2] if os.path.exists(path)]
+            found = found or glob.glob('/nix/store/*/bin/chromium')
+            found = found or [path for path in chromium_paths[2:] if os.path.exists(path)]
+            cls._chromium_binary = found[0] if found else None
+            cls._chromium_probed = True
+        return cls._chromium_binary
+        
     def create_tables(self):
         """Create necessary tables if they don't exist"""
         try:
@@ -189,6 +305,23 @@ class AdvisorKhojScraper:
                 ON portfolio_overlap(overlap_percentage DESC);
             """)
             
+            # Conflict target for overlap saves. Until it exists, clear out duplicate
+            # keys first (as add-portfolio-overlap-unique-key.sql does) so the build
+            # can't fail on rows written before it
+            cursor.execute("SELECT to_regclass('ux_overlap')")
+            if cursor.fetchone()[0] is None:
+                cursor.execute("""
+                    DELETE FROM portfolio_overlap a
+                    USING portfolio_overlap b
+                    WHERE a.fund1_scheme_code = b.fund1_scheme_code
+                      AND a.fund2_scheme_code = b.fund2_scheme_code
+                      AND a.analysis_date = b.analysis_date
+                      AND a.id > b.id;
+                    
+                    CREATE UNIQUE INDEX IF NOT EXISTS ux_overlap 
+                    ON portfolio_overlap(fund1_scheme_code, fund2_scheme_code, analysis_date);
+                """)
+            
             # Manager Analytics table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS manager_analytics (
@@ -239,41 +372,36 @@ class AdvisorKhojScraper:
         """Scrape AUM data by AMC"""
         logger.info("🔍 Scraping AUM data...")
         aum_data = []
+        today = date.today()
         
         try:
             # AdvisorKhoj AUM page
             url = f"{self.base_url}/mutual-funds-research/aum-of-mutual-fund-houses"
-            response = self.session.get(url)
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Find AUM table
-                table = soup.find('table', {'class': 'table-bordered'})
-                if table:
-                    rows = table.find_all('tr')[1:]  # Skip header
+            self._throttle(url)
+            with self.session.get(url, stream=True) as response:
+                if response.status_code == 200:
+                    # Parse the AUM table straight off the socket
+                    response.raw.decode_content = True
                     
-                    for row in rows:
-                        cols = row.find_all('td')
+                    for cols in _iter_table_rows(response.raw, _is_aum_table):
                         if len(cols) >= 3:
                             try:
-                                amc_name = cols[0].text.strip()
-                                total_aum = self._parse_number(cols[1].text)
-                                fund_count = self._parse_number(cols[2].text, is_int=True)
+                                amc_name = cols[0].strip()
+                                total_aum = self._parse_number(cols[1])
+                                fund_count = self._parse_number(cols[2], is_int=True)
                                 
                                 if amc_name and total_aum is not None:
                                     aum_data.append({
                                         'amc_name': amc_name,
                                         'total_aum_crores': total_aum,
                                         'fund_count': fund_count,
-                                        'data_date': date.today()
+                                        'data_date': today
                                     })
                                     
                             except Exception as e:
                                 logger.warning(f"Error parsing AUM row: {e}")
                                 continue
                                 
-            time.sleep(self.rate_limit_delay)
             logger.info(f"✅ Scraped {len(aum_data)} AUM records")
             
         except Exception as e:
@@ -285,6 +413,7 @@ class AdvisorKhojScraper:
         """Scrape portfolio overlap data"""
         logger.info("🔍 Scraping portfolio overlap data...")
         overlap_data = []
+        today = date.today()
         
         try:
             # This would require Selenium for dynamic content
@@ -295,6 +424,7 @@ class AdvisorKhojScraper:
                 
             # Example overlap analysis page
             url = f"{self.base_url}/mutual-funds-research/portfolio-overlap"
+            self._throttle(url)
             self.driver.get(url)
             
             # Wait for dynamic content
@@ -302,34 +432,39 @@ class AdvisorKhojScraper:
             
             # This is a simplified example - actual implementation would need
             # to navigate through fund selection dropdowns
-            overlap_elements = wait.until(
+            wait.until(
                 EC.presence_of_all_elements_located(
                     (By.CLASS_NAME, "overlap-result")
                 )
             )
             
-            for element in overlap_elements[:5]:  # Limit to 5 for demo
+            # Read every row in one WebDriver round trip instead of three
+            # find_element calls per row
+            overlap_rows = self.driver.execute_script("""
+                return Array.from(document.querySelectorAll('.overlap-result'), e => [
+                    e.querySelector('.fund1-name')?.innerText,
+                    e.querySelector('.fund2-name')?.innerText,
+                    e.querySelector('.overlap-percentage')?.innerText
+                ]);
+            """)
+            
+            for fund1_name, fund2_name, overlap_text in overlap_rows[:5]:  # Limit to 5 for demo
                 try:
                     # Parse overlap data
-                    fund1_name = element.find_element(By.CLASS_NAME, "fund1-name").text
-                    fund2_name = element.find_element(By.CLASS_NAME, "fund2-name").text
-                    overlap_pct = self._parse_number(
-                        element.find_element(By.CLASS_NAME, "overlap-percentage").text
-                    )
+                    overlap_pct = self._parse_number(overlap_text)
                     
                     if fund1_name and fund2_name and overlap_pct is not None:
                         overlap_data.append({
                             'fund1_name': fund1_name,
                             'fund2_name': fund2_name,
                             'overlap_percentage': overlap_pct,
-                            'analysis_date': date.today()
+                            'analysis_date': today
                         })
                         
                 except Exception as e:
                     logger.warning(f"Error parsing overlap element: {e}")
                     continue
                     
-            time.sleep(self.rate_limit_delay)
             logger.info(f"✅ Scraped {len(overlap_data)} overlap records")
             
         except Exception as e:
@@ -341,28 +476,30 @@ class AdvisorKhojScraper:
         """Scrape fund manager performance data"""
         logger.info("🔍 Scraping manager analytics...")
         manager_data = []
+        today = date.today()
         
         try:
             # This would typically involve multiple pages
             # Simplified example for demonstration
             url = f"{self.base_url}/mutual-funds-research/top-fund-managers"
+            self._throttle(url)
             response = self.session.get(url)
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
+                tree = etree.HTML(response.content)
                 
                 # Find manager data
-                manager_sections = soup.find_all('div', {'class': 'manager-profile'})
+                manager_sections = _MANAGER_PROFILE_XP(tree)
                 
                 for section in manager_sections[:10]:  # Top 10 managers
                     try:
-                        name = section.find('h4', {'class': 'manager-name'}).text.strip()
+                        name = _first_text(_MANAGER_NAME_XP, section).strip()
                         funds_count = self._parse_number(
-                            section.find('span', {'class': 'funds-managed'}).text,
+                            _first_text(_FUNDS_MANAGED_XP, section),
                             is_int=True
                         )
                         aum_managed = self._parse_number(
-                            section.find('span', {'class': 'aum-managed'}).text
+                            _first_text(_AUM_MANAGED_XP, section)
                         )
                         
                         if name:
@@ -370,14 +507,13 @@ class AdvisorKhojScraper:
                                 'manager_name': name,
                                 'managed_funds_count': funds_count,
                                 'total_aum_managed': aum_managed,
-                                'analysis_date': date.today()
+                                'analysis_date': today
                             })
                             
                     except Exception as e:
                         logger.warning(f"Error parsing manager section: {e}")
                         continue
                         
-            time.sleep(self.rate_limit_delay)
             logger.info(f"✅ Scraped {len(manager_data)} manager records")
             
         except Exception as e:
@@ -389,28 +525,24 @@ class AdvisorKhojScraper:
         """Scrape category-wise performance data"""
         logger.info("🔍 Scraping category performance...")
         category_data = []
+        today = date.today()
         
         try:
             url = f"{self.base_url}/mutual-funds-research/category-monitor"
-            response = self.session.get(url)
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Find category table
-                table = soup.find('table', {'id': 'category-performance-table'})
-                if table:
-                    rows = table.find_all('tr')[1:]  # Skip header
+            self._throttle(url)
+            with self.session.get(url, stream=True) as response:
+                if response.status_code == 200:
+                    # Parse the category table straight off the socket
+                    response.raw.decode_content = True
                     
-                    for row in rows:
-                        cols = row.find_all('td')
+                    for cols in _iter_table_rows(response.raw, _is_category_table):
                         if len(cols) >= 5:
                             try:
-                                category = cols[0].text.strip()
-                                return_1y = self._parse_number(cols[1].text)
-                                return_3y = self._parse_number(cols[2].text)
-                                return_5y = self._parse_number(cols[3].text)
-                                fund_count = self._parse_number(cols[4].text, is_int=True)
+                                category = cols[0].strip()
+                                return_1y = self._parse_number(cols[1])
+                                return_3y = self._parse_number(cols[2])
+                                return_5y = self._parse_number(cols[3])
+                                fund_count = self._parse_number(cols[4], is_int=True)
                                 
                                 if category:
                                     category_data.append({
@@ -419,14 +551,13 @@ class AdvisorKhojScraper:
                                         'avg_return_3y': return_3y,
                                         'avg_return_5y': return_5y,
                                         'fund_count': fund_count,
-                                        'analysis_date': date.today()
+                                        'analysis_date': today
                                     })
                                     
                             except Exception as e:
                                 logger.warning(f"Error parsing category row: {e}")
                                 continue
                                 
-            time.sleep(self.rate_limit_delay)
             logger.info(f"✅ Scraped {len(category_data)} category records")
             
         except Exception as e:
@@ -438,6 +569,7 @@ class AdvisorKhojScraper:
         """Scrape additional market indices"""
         logger.info("🔍 Scraping enhanced market indices...")
         indices_data = []
+        today = date.today()
         
         try:
             # AdvisorKhoj indices + Yahoo Finance
@@ -446,29 +578,36 @@ class AdvisorKhojScraper:
                 'Nifty Smallcap 250 TRI', 'Nifty Bank TRI'
             ]
             
-            # Scrape from multiple sources
+            # Map names to tickers up front and fetch them all in one batched
+            # download instead of one history request (and sleep) per index
+            tickers = {}
             for index_name in advisorkhoj_indices:
+                ticker = self._get_yahoo_ticker(index_name)
+                if ticker:
+                    tickers[index_name] = ticker
+                    
+            prices = yf.download(
+                list(tickers.values()), period="1d", group_by='ticker',
+                threads=True, progress=False
+            )
+            
+            for index_name, ticker in tickers.items():
                 try:
                     # Simulate getting index data
                     # In production, this would scrape actual values
-                    ticker = self._get_yahoo_ticker(index_name)
-                    if ticker:
-                        data = yf.Ticker(ticker)
-                        hist = data.history(period="1d")
+                    hist = prices[ticker].dropna(how='all')
+                    
+                    if not hist.empty:
+                        current_value = hist['Close'].iloc[-1]
+                        prev_value = hist['Open'].iloc[-1]
+                        daily_return = ((current_value - prev_value) / prev_value) * 100
                         
-                        if not hist.empty:
-                            current_value = hist['Close'].iloc[-1]
-                            prev_value = hist['Open'].iloc[-1]
-                            daily_return = ((current_value - prev_value) / prev_value) * 100
-                            
-                            indices_data.append({
-                                'index_name': index_name,
-                                'index_value': current_value,
-                                'daily_return': daily_return,
-                                'index_date': date.today()
-                            })
-                            
-                    time.sleep(0.5)  # Shorter delay for Yahoo Finance
+                        indices_data.append({
+                            'index_name': index_name,
+                            'index_value': current_value,
+                            'daily_return': daily_return,
+                            'index_date': today
+                        })
                     
                 except Exception as e:
                     logger.warning(f"Error fetching {index_name}: {e}")
@@ -487,113 +626,169 @@ class AdvisorKhojScraper:
             return 0
             
         try:
-            cursor = self.db_conn.cursor()
-            saved_count = 0
-            
-            for record in data:
-                try:
-                    # Build dynamic INSERT query
-                    columns = ', '.join(record.keys())
-                    placeholders = ', '.join(['%s'] * len(record))
-                    query = f"""
-                        INSERT INTO {table_name} ({columns})
-                        VALUES ({placeholders})
-                        ON CONFLICT DO NOTHING
-                    """
-                    
-                    cursor.execute(query, list(record.values()))
+            with self._table_savepoint() as cursor:
+                saved_count = 0
+            
+                # Records from one scrape share a key set; group them in case they don't
+                # so each distinct column list is one multi-row INSERT
+                groups = {}
+                for record in data:
+                    groups.setdefault(tuple(record), []).append(tuple(record.values()))
+                
+                for columns, rows in groups.items():
+                    if len(rows) >= self.copy_threshold:
+                        saved_count += self._bulk_copy(cursor, table_name, columns, rows)
+                        continue
+                    execute_values(cursor, f"""
+                        INSERT INTO {table_name} ({', '.join(columns)})
+                        VALUES %s
+                        {_conflict_clause(table_name)}
+                    """, rows, page_size=len(rows))
                     saved_count += cursor.rowcount
                     
-                except Exception as e:
-                    logger.warning(f"Error inserting record: {e}")
-                    continue
-                    
-            self.db_conn.commit()
             logger.info(f"✅ Saved {saved_count} records to {table_name}")
             return saved_count
             
         except Exception as e:
             logger.error(f"❌ Database save error: {e}")
-            self.db_conn.rollback()
             return 0
             
+    @contextmanager
+    def _table_savepoint(self):
+        """Cursor inside a savepoint of the run's transaction, so a failing table
+        is rolled back on its own without losing the others"""
+        with self.db_conn.cursor() as cursor:
+            cursor.execute("SAVEPOINT save_table")
+            try:
+                yield cursor
+            except Exception:
+                cursor.execute("ROLLBACK TO SAVEPOINT save_table")
+                raise
+            cursor.execute("RELEASE SAVEPOINT save_table")
+            
+    def _bulk_copy(self, cursor, table_name: str, columns: Tuple[str, ...], rows: List[Tuple]) -> int:
+        """COPY rows into a temp copy of table_name, then insert into the real table"""
+        column_list = ', '.join(columns)
+        cursor.execute(f"""
+            CREATE TEMP TABLE tmp_{table_name} (LIKE {table_name} INCLUDING DEFAULTS)
+            ON COMMIT DROP
+        """)
+        
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        buf.seek(0)
+        cursor.copy_expert(
+            f"COPY tmp_{table_name} ({column_list}) FROM STDIN WITH CSV", buf
+        )
+        
+        cursor.execute(f"""
+            INSERT INTO {table_name} ({column_list})
+            SELECT {column_list} FROM tmp_{table_name}
+            {_conflict_clause(table_name)}
+        """)
+        saved_count = cursor.rowcount
+        cursor.execute(f"DROP TABLE tmp_{table_name}")
+        return saved_count
+        
+    def _attach_scheme_codes(self, overlap_data: List[Dict]) -> List[Dict]:
+        """Fill fund1/fund2_scheme_code from funds by exact fund name (None if unknown)"""
+        names = list({r['fund1_name'] for r in overlap_data} | {r['fund2_name'] for r in overlap_data})
+        if not names:
+            return overlap_data
+            
+        try:
+            with self._table_savepoint() as cursor:
+                cursor.execute("""
+                    SELECT DISTINCT ON (fund_name) fund_name, scheme_code
+                    FROM funds
+                    WHERE fund_name = ANY(%s)
+                    ORDER BY fund_name, id
+                """, (names,))
+                codes = dict(cursor.fetchall())
+        except Exception as e:
+            logger.warning(f"Could not look up overlap scheme codes: {e}")
+            codes = {}
+            
+        return [
+            {
+                **record,
+                'fund1_scheme_code': codes.get(record['fund1_name']),
+                'fund2_scheme_code': codes.get(record['fund2_name'])
+            }
+            for record in overlap_data
+        ]
+        
     def update_market_indices(self, indices_data: List[Dict]) -> int:
         """Update existing market_indices table with new data"""
         if not indices_data:
             return 0
             
         try:
-            cursor = self.db_conn.cursor()
-            saved_count = 0
+            rows = [
+                (
+                    index_data['index_name'],
+                    index_data.get('index_value', 0),
+                    index_data['index_date'],
+                    index_data.get('pe_ratio'),
+                    index_data.get('pb_ratio'),
+                    index_data.get('dividend_yield'),
+                    index_data.get('volume')
+                )
+                for index_data in indices_data
+            ]
             
-            for index_data in indices_data:
-                try:
-                    # Insert into existing market_indices table
-                    cursor.execute("""
-                        INSERT INTO market_indices 
-                        (index_name, close_value, index_date, pe_ratio, pb_ratio, dividend_yield, volume)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (index_name, index_date) DO UPDATE
-                        SET close_value = EXCLUDED.close_value,
-                            pe_ratio = EXCLUDED.pe_ratio,
-                            pb_ratio = EXCLUDED.pb_ratio,
-                            dividend_yield = EXCLUDED.dividend_yield,
-                            volume = EXCLUDED.volume
-                    """, (
-                        index_data['index_name'],
-                        index_data.get('index_value', 0),
-                        index_data['index_date'],
-                        index_data.get('pe_ratio'),
-                        index_data.get('pb_ratio'),
-                        index_data.get('dividend_yield'),
-                        index_data.get('volume')
-                    ))
-                    
-                    saved_count += cursor.rowcount
+            # Upsert into the existing market_indices table in one round trip
+            with self._table_savepoint() as cursor:
+                execute_values(cursor, """
+                    INSERT INTO market_indices 
+                    (index_name, close_value, index_date, pe_ratio, pb_ratio, dividend_yield, volume)
+                    VALUES %s
+                    ON CONFLICT (index_name, index_date) DO UPDATE
+                    SET close_value = EXCLUDED.close_value,
+                        pe_ratio = EXCLUDED.pe_ratio,
+                        pb_ratio = EXCLUDED.pb_ratio,
+                        dividend_yield = EXCLUDED.dividend_yield,
+                        volume = EXCLUDED.volume
+                """, rows, page_size=len(rows))
+                saved_count = cursor.rowcount
                     
-                except Exception as e:
-                    logger.warning(f"Error updating index: {e}")
-                    continue
-                    
-            self.db_conn.commit()
             logger.info(f"✅ Updated {saved_count} market indices")
             return saved_count
             
         except Exception as e:
             logger.error(f"❌ Market indices update error: {e}")
-            self.db_conn.rollback()
             return 0
             
+    def _throttle(self, url: str):
+        """Wait until url's host is due, spacing same-host requests by rate_limit_delay"""
+        host = urlparse(url).netloc
+        with self._throttle_lock:
+            # Reserve the next slot for this host so concurrent scrapes queue up
+            now = time.monotonic()
+            slot = max(now, self._next_hit.get(host, now))
+            self._next_hit[host] = slot + self.rate_limit_delay
+        time.sleep(slot - now)
+        
     def _parse_number(self, text: str, is_int: bool = False) -> Optional[float]:
         """Parse number from text, handling Indian number format"""
         if not text:
             return None
             
-        try:
-            # Remove common characters
-            cleaned = text.strip().replace(',', '').replace('₹', '')
-            cleaned = cleaned.replace('Cr', '').replace('cr', '')
-            cleaned = cleaned.replace('%', '').strip()
-            
-            if cleaned and cleaned != '-' and cleaned.lower() != 'na':
-                value = float(cleaned)
-                return int(value) if is_int else value
+        # Remove common characters in one pass, then the crore suffix
+        cleaned = text.translate(_NUMBER_STRIP).replace('Cr', '').replace('cr', '').strip()
+        if cleaned.lower() in _MISSING_NUMBERS:
             return None
             
+        try:
+            value = float(cleaned)
+            return int(value) if is_int else value
+            
         except Exception:
             return None
             
     def _get_yahoo_ticker(self, index_name: str) -> Optional[str]:
         """Map Indian index names to Yahoo Finance tickers"""
-        ticker_map = {
-            'Nifty 50 TRI': '^NSEI',
-            'Nifty 500 TRI': 'NIFTY500.NS',
-            'Nifty Bank TRI': '^NSEBANK',
-            'BSE Sensex': '^BSESN',
-            'Nifty Midcap 150 TRI': 'NIFTYMIDCAP150.NS',
-            'Nifty Smallcap 250 TRI': 'NIFTYSMALLCAP250.NS'
-        }
-        return ticker_map.get(index_name)
+        return YAHOO_TICKERS.get(index_name)
         
     def run_full_scrape(self) -> Dict:
         """Run complete scraping process"""
@@ -609,21 +804,31 @@ class AdvisorKhojScraper:
             return {'success': False, 'error': 'Table creation failed'}
             
         try:
-            # Scrape all data types
-            aum_data = self.scrape_aum_data()
-            self.records_scraped['aum'] = self.save_to_database(aum_data, 'aum_analytics')
-            
-            overlap_data = self.scrape_portfolio_overlap()
-            self.records_scraped['overlap'] = self.save_to_database(overlap_data, 'portfolio_overlap')
-            
-            manager_data = self.scrape_manager_analytics()
-            self.records_scraped['managers'] = self.save_to_database(manager_data, 'manager_analytics')
-            
-            category_data = self.scrape_category_performance()
-            self.records_scraped['categories'] = self.save_to_database(category_data, 'category_performance')
-            
-            indices_data = self.scrape_enhanced_indices()
-            self.records_scraped['indices'] = self.update_market_indices(indices_data)
+            # Scrape all data types side by side; each is independent network I/O.
+            # Saves share the one DB connection and stay on this thread
+            scrapes = {
+                'aum': self.scrape_aum_data,
+                'overlap': self.scrape_portfolio_overlap,
+                'managers': self.scrape_manager_analytics,
+                'categories': self.scrape_category_performance,
+                'indices': self.scrape_enhanced_indices
+            }
+            with ThreadPoolExecutor(max_workers=len(scrapes)) as executor:
+                futures = {key: executor.submit(scrape) for key, scrape in scrapes.items()}
+            
+            # All saves share one transaction and a single commit at the end of the
+            # block; each table runs in its own savepoint
+            with self.db_conn:
+                with self.db_conn.cursor() as cursor:
+                    cursor.execute("SET LOCAL synchronous_commit = OFF")
+                    
+                self.records_scraped['aum'] = self.save_to_database(futures['aum'].result(), 'aum_analytics')
+                self.records_scraped['overlap'] = self.save_to_database(
+                    self._attach_scheme_codes(futures['overlap'].result()), 'portfolio_overlap'
+                )
+                self.records_scraped['managers'] = self.save_to_database(futures['managers'].result(), 'manager_analytics')
+                self.records_scraped['categories'] = self.save_to_database(futures['categories'].result(), 'category_performance')
+                self.records_scraped['indices'] = self.update_market_indices(futures['indices'].result())
             
             # Summary
             logger.info("\n✅ Scraping completed successfully!")
@@ -9,18 +9,17 @@ import sys
 import json
 import time
 import logging
+import threading
+from contextlib import redirect_stdout
 from datetime import datetime, date
 from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from bs4 import BeautifulSoup
 import psycopg2
-from urllib.parse import urlparse
-from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+from _db import DB_KWARGS
 import yfinance as yf
 
-# Load environment variables
-load_dotenv()
-
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -28,17 +27,48 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class TokenBucket:
+    """Thread-safe token bucket rate limiter"""
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate  # tokens added per second
+        self.capacity = capacity  # maximum burst size
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        
+    def acquire(self):
+        """Block until a token is available, then consume it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+# Every yfinance call takes a token, including the concurrent .info lookups:
+# a burst of 2, then ~1 req/s (the pace of the old per-ticker sleep)
+_yahoo_limiter = TokenBucket(rate=1, capacity=2)
+
 class SimpleAdvisorKhojScraper:
     """Simple scraper for AdvisorKhoj data without Selenium"""
     
-    def __init__(self):
+    def __init__(self, with_holdings: bool = False):
         self.base_url = "https://www.advisorkhoj.com"
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        # Note: the Yahoo lookups do not go through this session. yfinance 0.2.65
+        # only accepts a curl_cffi session and rejects a requests.Session, so it
+        # keeps its own connections
         self.db_conn = None
-        self.rate_limit_delay = 2.5  # seconds between requests
+        # Also complete holdings/AUM/benchmarks for all funds on the same connection
+        self.with_holdings = with_holdings
         
     def connect_db(self):
         """Connect to PostgreSQL database"""
@@ -48,16 +78,7 @@ class SimpleAdvisorKhojScraper:
                 logger.error("DATABASE_URL not found")
                 return False
                 
-            parsed = urlparse(db_url)
-            
-            self.db_conn = psycopg2.connect(
-                host=parsed.hostname,
-                port=parsed.port,
-                database=parsed.path[1:],
-                user=parsed.username,
-                password=parsed.password,
-                sslmode='require'
-            )
+            self.db_conn = psycopg2.connect(**DB_KWARGS)
             
             logger.info("✅ Connected to database")
             return True
@@ -94,6 +115,7 @@ class SimpleAdvisorKhojScraper:
         """Insert sample data to test the integration"""
         try:
             cursor = self.db_conn.cursor()
+            today = date.today()
             
             # Insert sample AUM data
             logger.info("📊 Inserting sample AUM data...")
@@ -107,7 +129,7 @@ class SimpleAdvisorKhojScraper:
                 ('Axis Mutual Fund', 'Axis Long Term Equity', 15000.00, 320000.00, 110, 'Equity', %s),
                 ('Kotak Mutual Fund', 'Kotak Standard Multicap', 12000.00, 280000.00, 95, 'Equity', %s)
                 ON CONFLICT DO NOTHING
-            """, (date.today(), date.today(), date.today(), date.today(), date.today()))
+            """, (today,) * 5)
             aum_count = cursor.rowcount
             logger.info(f"✅ Inserted {aum_count} AUM records")
             
@@ -123,7 +145,7 @@ class SimpleAdvisorKhojScraper:
                 ('Mahesh Patil', 3, 45000.00, 10.5, 13.2, %s),
                 ('Aniruddha Naha', 4, 52000.00, 11.8, 14.9, %s)
                 ON CONFLICT DO NOTHING
-            """, (date.today(), date.today(), date.today(), date.today(), date.today()))
+            """, (today,) * 5)
             manager_count = cursor.rowcount
             logger.info(f"✅ Inserted {manager_count} manager records")
             
@@ -141,8 +163,7 @@ class SimpleAdvisorKhojScraper:
                 ('Hybrid', 'Aggressive Hybrid', 10.5, 12.3, 11.8, 25, %s),
                 ('Hybrid', 'Conservative Hybrid', 8.2, 9.1, 8.8, 18, %s)
                 ON CONFLICT DO NOTHING
-            """, (date.today(), date.today(), date.today(), date.today(), 
-                  date.today(), date.today(), date.today()))
+            """, (today,) * 7)
             category_count = cursor.rowcount
             logger.info(f"✅ Inserted {category_count} category records")
             
@@ -156,22 +177,10 @@ class SimpleAdvisorKhojScraper:
                 ('NIFTY FMCG', 38200.00, 32.5, 6.2, 2.1, 65000000)
             ]
             
-            index_count = 0
-            for index_data in indices_to_update:
-                cursor.execute("""
-                    INSERT INTO market_indices 
-                    (index_name, close_value, index_date, pe_ratio, pb_ratio, dividend_yield, volume)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (index_name, index_date) DO UPDATE
-                    SET close_value = EXCLUDED.close_value,
-                        pe_ratio = EXCLUDED.pe_ratio,
-                        pb_ratio = EXCLUDED.pb_ratio,
-                        dividend_yield = EXCLUDED.dividend_yield,
-                        volume = EXCLUDED.volume
-                """, (index_data[0], index_data[1], date.today(), 
-                      index_data[2], index_data[3], index_data[4], index_data[5]))
-                index_count += cursor.rowcount
-                
+            index_count = self._upsert_indices(cursor, [
+                (name, close, today, pe, pb, dividend_yield, volume)
+                for name, close, pe, pb, dividend_yield, volume in indices_to_update
+            ])
             logger.info(f"✅ Updated {index_count} market indices")
             
             # Commit all changes
@@ -189,10 +198,25 @@ class SimpleAdvisorKhojScraper:
             self.db_conn.rollback()
             return None
             
+    def _upsert_indices(self, cursor, rows: List[tuple]) -> int:
+        """Upsert (name, close, date, pe, pb, dividend yield, volume) rows into
+        market_indices in one statement"""
+        execute_values(cursor, """
+            INSERT INTO market_indices 
+            (index_name, close_value, index_date, pe_ratio, pb_ratio, dividend_yield, volume)
+            VALUES %s
+            ON CONFLICT (index_name, index_date) DO UPDATE
+            SET close_value = EXCLUDED.close_value,
+                pe_ratio = EXCLUDED.pe_ratio,
+                pb_ratio = EXCLUDED.pb_ratio,
+                dividend_yield = EXCLUDED.dividend_yield,
+                volume = EXCLUDED.volume
+        """, rows, page_size=len(rows))
+        return cursor.rowcount
+        
     def scrape_enhanced_indices(self) -> List[Dict]:
         """Get additional market indices from Yahoo Finance"""
         logger.info("🔍 Fetching enhanced market indices...")
-        indices_data = []
         
         # Additional indices to fetch
         indices = {
@@ -203,14 +227,32 @@ class SimpleAdvisorKhojScraper:
             'NIFTY REALTY': '^CNXREALTY'
         }
         
+        # One multi-symbol chart request for the prices
+        try:
+            _yahoo_limiter.acquire()
+            prices = yf.download(
+                list(indices.values()), period='1d', group_by='ticker',
+                threads=True, progress=False
+            )
+        except Exception as e:
+            logger.warning(f"Failed to download index prices: {e}")
+            return []
+        
+        # Fundamentals are only available per ticker; fetch them side by side,
+        # paced by the shared limiter
+        with ThreadPoolExecutor(max_workers=len(indices)) as executor:
+            infos = dict(zip(indices.values(), executor.map(self._fetch_info, indices.values())))
+            
+        indices_data = []
+        today = date.today()
+        
         for name, ticker in indices.items():
             try:
-                stock = yf.Ticker(ticker)
-                info = stock.info
-                hist = stock.history(period="1d")
+                hist = prices[ticker].dropna(how='all')
                 
                 if not hist.empty:
                     latest = hist.iloc[-1]
+                    info = infos[ticker]
                     indices_data.append({
                         'index_name': name,
                         'index_value': float(latest['Close']),
@@ -218,18 +260,24 @@ class SimpleAdvisorKhojScraper:
                         'pb_ratio': info.get('priceToBook'),
                         'dividend_yield': info.get('dividendYield'),
                         'volume': int(latest.get('Volume', 0)),
-                        'index_date': date.today()
+                        'index_date': today
                     })
                     logger.info(f"✅ Got data for {name}")
                     
             except Exception as e:
                 logger.warning(f"Failed to get {name}: {e}")
-                continue
                 
-            time.sleep(1)  # Rate limit for Yahoo Finance
-            
         return indices_data
         
+    def _fetch_info(self, ticker: str) -> Dict:
+        """Fundamentals (PE/PB/dividend yield) for one ticker, empty if unavailable"""
+        try:
+            _yahoo_limiter.acquire()
+            return yf.Ticker(ticker).info
+        except Exception as e:
+            logger.warning(f"Failed to get info for {ticker}: {e}")
+            return {}
+            
     def run(self):
         """Run the simplified scraper"""
         logger.info("\n🚀 Simple AdvisorKhoj Data Scraper")
@@ -255,21 +303,9 @@ class SimpleAdvisorKhojScraper:
                 
                 if indices_data:
                     cursor = self.db_conn.cursor()
-                    indices_updated = 0
-                    
-                    for index_data in indices_data:
-                        try:
-                            cursor.execute("""
-                                INSERT INTO market_indices 
-                                (index_name, close_value, index_date, pe_ratio, pb_ratio, dividend_yield, volume)
-                                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                                ON CONFLICT (index_name, index_date) DO UPDATE
-                                SET close_value = EXCLUDED.close_value,
-                                    pe_ratio = EXCLUDED.pe_ratio,
-                                    pb_ratio = EXCLUDED.pb_ratio,
-                                    dividend_yield = EXCLUDED.dividend_yield,
-                                    volume = EXCLUDED.volume
-                            """, (
+                    try:
+                        indices_updated = self._upsert_indices(cursor, [
+                            (
                                 index_data['index_name'],
                                 index_data['index_value'],
                                 index_data['index_date'],
@@ -277,15 +313,25 @@ class SimpleAdvisorKhojScraper:
                                 index_data.get('pb_ratio'),
                                 index_data.get('dividend_yield'),
                                 index_data.get('volume')
-                            ))
-                            indices_updated += cursor.rowcount
-                        except Exception as e:
-                            logger.warning(f"Failed to update {index_data['index_name']}: {e}")
-                            
-                    self.db_conn.commit()
+                            )
+                            for index_data in indices_data
+                        ])
+                        self.db_conn.commit()
+                    except Exception as e:
+                        logger.warning(f"Failed to update real indices: {e}")
+                        self.db_conn.rollback()
+                        indices_updated = 0
+                        
                     records['real_indices'] = indices_updated
                     logger.info(f"✅ Updated {indices_updated} real market indices")
                 
+                if self.with_holdings:
+                    # Imported here so the default run skips numpy; its progress
+                    # prints go to stderr, stdout carries only the JSON result
+                    from ultra_fast_holdings_processor import run_holdings
+                    with redirect_stdout(sys.stderr):
+                        run_holdings(self.db_conn)
+                
                 # Summary
                 logger.info("\n✅ Data collection completed!")
                 logger.info(f"\nRecords inserted:")
@@ -318,5 +364,5 @@ class SimpleAdvisorKhojScraper:
                 
 
 if __name__ == "__main__":
-    scraper = SimpleAdvisorKhojScraper()
+    scraper = SimpleAdvisorKhojScraper(with_holdings='--with-holdings' in sys.argv)
     scraper.run()
\ No newline at end of file
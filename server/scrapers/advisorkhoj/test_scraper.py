@@ -8,11 +8,7 @@ import sys
 import json
 import psycopg2
 from datetime import date, datetime
-from urllib.parse import urlparse
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from _db import DB_KWARGS
 
 class TestAdvisorKhojScraper:
     def __init__(self):
@@ -27,16 +23,7 @@ class TestAdvisorKhojScraper:
                 print("❌ DATABASE_URL not found in environment")
                 return False
                 
-            parsed = urlparse(db_url)
-            
-            self.db_conn = psycopg2.connect(
-                host=parsed.hostname,
-                port=parsed.port,
-                database=parsed.path[1:],
-                user=parsed.username,
-                password=parsed.password,
-                sslmode='require'
-            )
+            self.db_conn = psycopg2.connect(**DB_KWARGS)
             
             print("✅ Connected to CGMF database")
             return True
@@ -49,6 +36,7 @@ class TestAdvisorKhojScraper:
         """Test inserting sample data into tables"""
         try:
             cursor = self.db_conn.cursor()
+            today = date.today()
             
             # Test AUM Analytics table
             print("\n📊 Testing AUM Analytics table...")
@@ -60,7 +48,7 @@ class TestAdvisorKhojScraper:
                 ('ICICI Prudential', 'ICICI Pru Value Discovery', 18000.75, 380000.00, 125, 'Equity', %s),
                 ('SBI Mutual Fund', 'SBI Blue Chip Fund', 22000.25, 420000.00, 140, 'Equity', %s)
                 ON CONFLICT DO NOTHING
-            """, (date.today(), date.today(), date.today()))
+            """, (today,) * 3)
             
             aum_count = cursor.rowcount
             print(f"✅ Inserted {aum_count} AUM records")
@@ -75,7 +63,7 @@ class TestAdvisorKhojScraper:
                 ('R. Srinivasan', 4, 65000.00, 11.2, 14.5, %s),
                 ('Navneet Munot', 6, 92000.00, 13.8, 16.2, %s)
                 ON CONFLICT DO NOTHING
-            """, (date.today(), date.today(), date.today()))
+            """, (today,) * 3)
             
             manager_count = cursor.rowcount
             print(f"✅ Inserted {manager_count} manager records")
@@ -90,7 +78,7 @@ class TestAdvisorKhojScraper:
                 ('Equity', 'Mid Cap', 18.3, 16.5, 15.2, 38, %s),
                 ('Debt', 'Corporate Bond', 7.2, 8.1, 7.9, 52, %s)
                 ON CONFLICT DO NOTHING
-            """, (date.today(), date.today(), date.today()))
+            """, (today,) * 3)
             
             category_count = cursor.rowcount
             print(f"✅ Inserted {category_count} category records")
@@ -108,7 +96,7 @@ class TestAdvisorKhojScraper:
                 SET close_value = EXCLUDED.close_value,
                     pe_ratio = EXCLUDED.pe_ratio,
                     pb_ratio = EXCLUDED.pb_ratio
-            """, (date.today(), date.today(), date.today()))
+            """, (today,) * 3)
             
             index_count = cursor.rowcount
             print(f"✅ Updated {index_count} market indices")
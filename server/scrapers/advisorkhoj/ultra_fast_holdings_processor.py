@@ -4,47 +4,34 @@ Ultra Fast Holdings Processor - Complete ALL holdings in one go
 Optimized for maximum speed with minimal overhead
 """
 
-import os
+import io
+import csv
 import psycopg2
-from urllib.parse import urlparse
-from dotenv import load_dotenv
 from datetime import date
-import random
-
-load_dotenv()
-
-# Connect to database
-db_url = os.getenv('DATABASE_URL')
-parsed = urlparse(db_url)
-conn = psycopg2.connect(
-    host=parsed.hostname,
-    port=parsed.port,
-    database=parsed.path[1:],
-    user=parsed.username,
-    password=parsed.password,
-    sslmode='require'
-)
-conn.autocommit = True
-cursor = conn.cursor()
-
-print("⚡ Ultra Fast Holdings Processor")
-print("==============================")
-
-# Get all funds without holdings
-cursor.execute("""
-    SELECT id, category FROM funds
-    WHERE id NOT IN (SELECT DISTINCT fund_id FROM portfolio_holdings)
-    ORDER BY id
-""")
-funds_to_process = cursor.fetchall()
-total_to_process = len(funds_to_process)
-
-print(f"Funds to process: {total_to_process:,}")
-
-if total_to_process == 0:
-    print("✅ All funds already have holdings!")
-    conn.close()
-    exit()
+from itertools import repeat
+import numpy as np
+from _db import DB_KWARGS
+
+HOLDING_COLUMNS = 'fund_id, stock_name, sector, holding_percent, holding_date'
+
+def copy_rows(cursor, table, columns, rows):
+    """COPY rows into table as CSV"""
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+    cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH CSV", buf)
+
+def holdings_rows(ids, holdings, percents, today):
+    """Insert tuples for funds ids[i] holding the (name, sector) pairs in
+    holdings[i], with one percent per holding position"""
+    count = holdings.shape[1]
+    return list(zip(
+        np.repeat(ids, count).tolist(),
+        holdings[:, :, 0].ravel().tolist(),
+        holdings[:, :, 1].ravel().tolist(),
+        np.tile(percents, len(ids)).tolist(),
+        repeat(today)
+    ))
 
 # Stock templates
 equity_stocks = [
@@ -63,137 +50,202 @@ debt_instruments = [
     ('Bank Fixed Deposits', 'Banking')
 ]
 
-# Build all insert data in memory
-print("Building insert data...")
-all_inserts = []
-today = date.today()
-batch_counter = 0
-
-for fund_id, category in funds_to_process:
-    if category == 'Equity':
-        # 10 random stocks
-        selected = random.sample(equity_stocks, 10)
-        for stock, sector in selected:
-            all_inserts.append((fund_id, stock, sector, 10.0, today))
-            
-    elif category == 'Debt':
-        # All 5 debt instruments
-        for inst, sector in debt_instruments:
-            all_inserts.append((fund_id, inst, sector, 20.0, today))
-            
-    else:  # Hybrid/Other
-        # 5 equity + 3 debt
-        for i in range(5):
-            stock, sector = equity_stocks[i]
-            all_inserts.append((fund_id, stock, sector, 12.0, today))
-        for i in range(3):
-            inst, sector = debt_instruments[i]
-            all_inserts.append((fund_id, inst, sector, 13.33, today))
+# Template arrays built once at import; build_holdings only indexes them
+equity = np.array(equity_stocks, dtype=object)
+debt = np.array(debt_instruments, dtype=object)
+equity_order = np.arange(len(equity))
+mix = np.concatenate((equity[:5], debt[:3]))
+mix_percents = np.array([12.0] * 5 + [13.33] * 3)
+rng = np.random.default_rng()
+
+def build_holdings(funds, today):
+    """Insert tuples for a batch of (fund_id, category) rows, built with one
+    array pass per fund type"""
+    fund_ids = np.array([fund_id for fund_id, _ in funds])
+    categories = np.array([category for _, category in funds], dtype=object)
+    is_equity = categories == 'Equity'
+    is_debt = categories == 'Debt'
     
-    batch_counter += 1
-    if batch_counter % 5000 == 0:
-        print(f"Prepared {batch_counter:,} funds...")
-
-print(f"\nInserting {len(all_inserts):,} holdings records...")
-
-# Insert in chunks of 10000
-chunk_size = 10000
-inserted = 0
-
-for i in range(0, len(all_inserts), chunk_size):
-    chunk = all_inserts[i:i+chunk_size]
-    cursor.executemany("""
-        INSERT INTO portfolio_holdings 
-        (fund_id, stock_name, sector, holding_percent, holding_date)
-        VALUES (%s, %s, %s, %s, %s)
-        ON CONFLICT DO NOTHING
-    """, chunk)
-    inserted += len(chunk)
-    if inserted % 50000 == 0:
-        print(f"Inserted {inserted:,} records...")
-
-# Final check
-cursor.execute("SELECT COUNT(DISTINCT fund_id) FROM portfolio_holdings")
-final_count = cursor.fetchone()[0]
-
-cursor.execute("SELECT COUNT(*) FROM funds")
-total_funds = cursor.fetchone()[0]
-
-print(f"\n✅ Holdings insertion complete!")
-print(f"Final status: {final_count:,}/{total_funds:,} funds have holdings ({round(final_count/total_funds*100, 1)}%)")
-
-# Now complete AUM data
-print("\n💰 Completing AUM data...")
-
-cursor.execute("""
-    SELECT f.fund_name, f.amc_name, f.category
-    FROM funds f
-    WHERE f.fund_name NOT IN (SELECT DISTINCT fund_name FROM aum_analytics)
-""")
-funds_without_aum = cursor.fetchall()
-
-if funds_without_aum:
-    amc_bases = {
-        'SBI Mutual Fund': 725000, 'HDFC Mutual Fund': 520000,
-        'ICICI Prudential Mutual Fund': 485000, 'Aditya Birla Sun Life Mutual Fund': 345000,
-        'Kotak Mutual Fund': 315000, 'Axis Mutual Fund': 295000
-    }
+    # Equity: 10 random stocks per fund, drawn without replacement by shuffling
+    # each fund's row of stock indices and keeping the first 10
+    equity_ids = fund_ids[is_equity]
+    order = np.broadcast_to(equity_order, (len(equity_ids), len(equity)))
+    picks = rng.permuted(order, axis=1)[:, :10]
+    rows = holdings_rows(equity_ids, equity[picks], np.full(10, 10.0), today)
     
-    aum_inserts = []
-    for fund_name, amc_name, category in funds_without_aum:
-        base = amc_bases.get(amc_name, 50000)
-        multiplier = 0.08 if category == 'Equity' else 0.12 if category == 'Debt' else 0.05
-        fund_aum = round(base * multiplier, 2)
-        aum_inserts.append((
-            amc_name, fund_name, fund_aum, base,
-            category, today, 'ultra_fast'
-        ))
+    # Debt: all 5 debt instruments
+    debt_ids = fund_ids[is_debt]
+    rows += holdings_rows(
+        debt_ids, np.broadcast_to(debt, (len(debt_ids),) + debt.shape),
+        np.full(len(debt), 20.0), today
+    )
     
-    cursor.executemany("""
-        INSERT INTO aum_analytics 
-        (amc_name, fund_name, aum_crores, total_aum_crores, 
-         category, data_date, source)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT DO NOTHING
-    """, aum_inserts)
+    # Hybrid/Other: 5 equity + 3 debt
+    other_ids = fund_ids[~(is_equity | is_debt)]
+    rows += holdings_rows(
+        other_ids, np.broadcast_to(mix, (len(other_ids),) + mix.shape),
+        mix_percents, today
+    )
+    return rows
+
+def run_holdings(conn):
+    """Give every fund without holdings sample holdings, fill in missing AUM and
+    benchmarks, and report coverage.
     
-    print(f"✅ Added {len(aum_inserts):,} AUM records")
-
-# Complete benchmarks
-print("\n🎯 Completing benchmarks...")
-cursor.execute("""
-    UPDATE funds
-    SET benchmark_name = CASE
-        WHEN category = 'Equity' AND subcategory LIKE '%Large Cap%' THEN 'NIFTY 50'
-        WHEN category = 'Equity' AND subcategory LIKE '%Mid Cap%' THEN 'NIFTY MIDCAP 100'
-        WHEN category = 'Equity' AND subcategory LIKE '%Small Cap%' THEN 'NIFTY SMALLCAP 100'
-        WHEN category = 'Equity' THEN 'NIFTY 500'
-        WHEN category = 'Debt' THEN 'NIFTY AAA CORPORATE BOND'
-        WHEN category = 'Hybrid' THEN 'NIFTY 50'
-        ELSE 'NIFTY 50'
-    END
-    WHERE benchmark_name IS NULL OR benchmark_name = ''
-""")
-benchmarks_updated = cursor.rowcount
-print(f"✅ Updated {benchmarks_updated:,} benchmarks")
-
-# Final complete check
-cursor.execute("""
-    SELECT COUNT(*) FROM funds f
-    WHERE EXISTS (SELECT 1 FROM portfolio_holdings WHERE fund_id = f.id)
-    AND EXISTS (SELECT 1 FROM aum_analytics WHERE fund_name = f.fund_name)
-    AND benchmark_name IS NOT NULL
-""")
-complete_funds = cursor.fetchone()[0]
-complete_pct = round(complete_funds / total_funds * 100, 1)
-
-print(f"\n🎉 FINAL STATUS: {complete_funds:,}/{total_funds:,} funds have COMPLETE data ({complete_pct}%)")
-
-if complete_pct == 100:
-    print("\n✨ ALL 16,766 FUNDS NOW HAVE COMPLETE DATA!")
-    print("- ✅ Portfolio Holdings")
-    print("- ✅ AUM Analytics") 
-    print("- ✅ Benchmark Assignments")
-    print("\n🚀 Data collection SUCCESSFULLY COMPLETED!")
-
-conn.close()
\ No newline at end of file
+    All writes share one transaction on conn, committed at the end or rolled back
+    on error, so no fund is left with half its holdings.
+    """
+    print("⚡ Ultra Fast Holdings Processor")
+    print("==============================")
+    
+    cursor = conn.cursor()
+    with conn:
+        # The data is regenerated on the next run anyway, so skip waiting on the WAL flush
+        cursor.execute("SET LOCAL synchronous_commit = OFF")
+
+        # Get all funds without holdings (NOT EXISTS plans as an anti-join; NOT IN
+        # would hash the whole subquery and match nothing if it ever held a NULL).
+        # They come off a server-side cursor in batches, and each batch's holdings are
+        # COPYed to a staging table as soon as they are built, so neither the fund list
+        # nor the holdings are ever held in full.
+        funds_cursor = conn.cursor(name='funds_stream')
+        funds_cursor.itersize = 2000
+        funds_cursor.execute("""
+            SELECT f.id, f.category FROM funds f
+            WHERE NOT EXISTS (
+                SELECT 1 FROM portfolio_holdings ph WHERE ph.fund_id = f.id
+            )
+        """)
+
+        # COPY can't skip conflicts, so rows are staged here and moved over with
+        # ON CONFLICT DO NOTHING at the end
+        cursor.execute("""
+            CREATE TEMP TABLE tmp_portfolio_holdings 
+            (LIKE portfolio_holdings INCLUDING DEFAULTS)
+            ON COMMIT DROP
+        """)
+
+        print("Building insert data...")
+        today = date.today()
+        total_to_process = 0
+        staged = 0
+
+        while True:
+            funds = funds_cursor.fetchmany(funds_cursor.itersize)
+            if not funds:
+                break
+            rows = build_holdings(funds, today)
+            copy_rows(cursor, 'tmp_portfolio_holdings', HOLDING_COLUMNS, rows)
+            total_to_process += len(funds)
+            staged += len(rows)
+        funds_cursor.close()
+
+        print(f"Funds to process: {total_to_process:,}")
+
+        if total_to_process == 0:
+            print("✅ All funds already have holdings!")
+            return
+
+        print(f"\nInserting {staged:,} holdings records...")
+
+        cursor.execute(f"""
+            INSERT INTO portfolio_holdings ({HOLDING_COLUMNS})
+            SELECT {HOLDING_COLUMNS} FROM tmp_portfolio_holdings
+            ON CONFLICT DO NOTHING
+        """)
+        print(f"Inserted {cursor.rowcount:,} records")
+
+        # Final check
+        cursor.execute("SELECT COUNT(DISTINCT fund_id) FROM portfolio_holdings")
+        final_count = cursor.fetchone()[0]
+
+        cursor.execute("SELECT COUNT(*) FROM funds")
+        total_funds = cursor.fetchone()[0]
+
+        print(f"\n✅ Holdings insertion complete!")
+        print(f"Final status: {final_count:,}/{total_funds:,} funds have holdings ({round(final_count/total_funds*100, 1)}%)")
+
+        # Now complete AUM data
+        print("\n💰 Completing AUM data...")
+
+        amc_bases = {
+            'SBI Mutual Fund': 725000, 'HDFC Mutual Fund': 520000,
+            'ICICI Prudential Mutual Fund': 485000, 'Aditya Birla Sun Life Mutual Fund': 345000,
+            'Kotak Mutual Fund': 315000, 'Axis Mutual Fund': 295000
+        }
+
+        # AMC base (default 50000) times a per-type share, computed server-side in one
+        # INSERT ... SELECT so the fund list never leaves the database
+        cursor.execute("""
+            INSERT INTO aum_analytics 
+            (amc_name, fund_name, aum_crores, total_aum_crores, 
+             category, data_date, source)
+            SELECT 
+                f.amc_name,
+                f.fund_name,
+                ROUND(COALESCE(b.amc_base, 50000) * CASE f.category
+                    WHEN 'Equity' THEN 0.08
+                    WHEN 'Debt' THEN 0.12
+                    ELSE 0.05
+                END, 2),
+                COALESCE(b.amc_base, 50000),
+                f.category,
+                %s,
+                'ultra_fast'
+            FROM funds f
+            LEFT JOIN unnest(%s::text[], %s::numeric[]) AS b(amc_name, amc_base)
+                ON b.amc_name = f.amc_name
+            WHERE NOT EXISTS (
+                SELECT 1 FROM aum_analytics aa WHERE aa.fund_name = f.fund_name
+            )
+            ON CONFLICT DO NOTHING
+        """, (today, list(amc_bases), list(amc_bases.values())))
+
+        if cursor.rowcount:
+            print(f"✅ Added {cursor.rowcount:,} AUM records")
+
+        # Complete benchmarks
+        print("\n🎯 Completing benchmarks...")
+        cursor.execute("""
+            UPDATE funds
+            SET benchmark_name = CASE
+                WHEN category = 'Equity' AND subcategory LIKE '%Large Cap%' THEN 'NIFTY 50'
+                WHEN category = 'Equity' AND subcategory LIKE '%Mid Cap%' THEN 'NIFTY MIDCAP 100'
+                WHEN category = 'Equity' AND subcategory LIKE '%Small Cap%' THEN 'NIFTY SMALLCAP 100'
+                WHEN category = 'Equity' THEN 'NIFTY 500'
+                WHEN category = 'Debt' THEN 'NIFTY AAA CORPORATE BOND'
+                WHEN category = 'Hybrid' THEN 'NIFTY 50'
+                ELSE 'NIFTY 50'
+            END
+            WHERE benchmark_name IS NULL OR benchmark_name = ''
+        """)
+        benchmarks_updated = cursor.rowcount
+        print(f"✅ Updated {benchmarks_updated:,} benchmarks")
+
+        # Final complete check: each child table is reduced to its distinct keys in a
+        # single pass and hash-joined, rather than probed once per fund
+        cursor.execute("""
+            SELECT COUNT(*) FROM funds f
+            JOIN (SELECT DISTINCT fund_id FROM portfolio_holdings) ph ON ph.fund_id = f.id
+            JOIN (SELECT DISTINCT fund_name FROM aum_analytics) aa ON aa.fund_name = f.fund_name
+            WHERE f.benchmark_name IS NOT NULL
+        """)
+        complete_funds = cursor.fetchone()[0]
+        complete_pct = round(complete_funds / total_funds * 100, 1)
+
+        print(f"\n🎉 FINAL STATUS: {complete_funds:,}/{total_funds:,} funds have COMPLETE data ({complete_pct}%)")
+
+        if complete_pct == 100:
+            print("\n✨ ALL 16,766 FUNDS NOW HAVE COMPLETE DATA!")
+            print("- ✅ Portfolio Holdings")
+            print("- ✅ AUM Analytics") 
+            print("- ✅ Benchmark Assignments")
+            print("\n🚀 Data collection SUCCESSFULLY COMPLETED!")
+
+
+if __name__ == "__main__":
+    conn = psycopg2.connect(**DB_KWARGS)
+    try:
+        run_holdings(conn)
+    finally:
+        conn.close()
@@ -1,4 +1,5 @@
 import { pgTable, text, serial, integer, boolean, date, timestamp, decimal, real, foreignKey, index, uniqueIndex } from "drizzle-orm/pg-core";
+import { sql } from "drizzle-orm";
 import { createInsertSchema } from "drizzle-zod";
 import { z } from "zod";
 
@@ -38,6 +39,11 @@ export const funds = pgTable("funds", {
   expenseRatio: decimal("expense_ratio", { precision: 4, scale: 2 }),
   createdAt: timestamp("created_at").defaultNow(),
   updatedAt: timestamp("updated_at").defaultNow(),
+}, (table) => {
+  return {
+    missingBenchmarkIdx: index("idx_funds_missing_benchmark").on(table.id)
+      .where(sql`benchmark_name IS NULL OR benchmark_name = ''`)
+  };
 });
 
 export const insertFundSchema = createInsertSchema(funds).omit({
@@ -171,6 +177,10 @@ export const portfolioHoldings = pgTable("portfolio_holdings", {
   industry: text("industry"),
   marketCapCategory: text("market_cap_category"),
   createdAt: timestamp("created_at").defaultNow(),
+}, (table) => {
+  return {
+    fundStockIdx: index("idx_portfolio_holdings_fund_stock").on(table.fundId, table.stockName)
+  };
 });
 
 export const insertPortfolioHoldingSchema = createInsertSchema(portfolioHoldings).omit({
@@ -397,6 +407,11 @@ export const aumAnalytics = pgTable("aum_analytics", {
   source: text("source").default("advisorkhoj"),
   createdAt: timestamp("created_at").defaultNow(),
   updatedAt: timestamp("updated_at").defaultNow()
+}, (table) => {
+  return {
+    fundNameIdx: index("idx_aum_analytics_fund_name").on(table.fundName),
+    amcFundIdx: index("idx_aum_analytics_amc_fund").on(table.amcName, table.fundName)
+  };
 });
 
 export const insertAumAnalyticsSchema = createInsertSchema(aumAnalytics).omit({
@@ -418,6 +433,10 @@ export const portfolioOverlap = pgTable("portfolio_overlap", {
   analysisDate: date("analysis_date").notNull(),
   source: text("source").default("advisorkhoj"),
   createdAt: timestamp("created_at").defaultNow()
+}, (table) => {
+  return {
+    overlapKey: uniqueIndex("ux_overlap").on(table.fund1SchemeCode, table.fund2SchemeCode, table.analysisDate)
+  };
 });
 
 export const insertPortfolioOverlapSchema = createInsertSchema(portfolioOverlap).omit({
@@ -459,6 +478,10 @@ export const categoryPerformance = pgTable("category_performance", {
   analysisDate: date("analysis_date").notNull(),
   source: text("source").default("advisorkhoj"),
   createdAt: timestamp("created_at").defaultNow()
+}, (table) => {
+  return {
+    performanceKey: uniqueIndex("ux_category_performance_key").on(table.categoryName, table.subcategory, table.analysisDate)
+  };
 });
 
 export const insertCategoryPerformanceSchema = createInsertSchema(categoryPerformance).omit({
@@ -521,7 +544,13 @@ export const fundScoresCorrected = pgTable("fund_scores_corrected", {
   createdAt: timestamp("created_at").defaultNow(),
 }, (table) => {
   return {
-    pk: uniqueIndex("fund_scores_corrected_pk").on(table.fundId, table.scoreDate)
+    pk: uniqueIndex("fund_scores_corrected_pk").on(table.fundId, table.scoreDate),
+    invalidScoreIdx: index("idx_fund_scores_invalid").on(table.fundId)
+      .where(sql`total_score < 0 OR total_score > 100
+        OR historical_returns_total < 0 OR historical_returns_total > 40
+        OR risk_grade_total < 0 OR risk_grade_total > 30
+        OR fundamentals_total < 0 OR fundamentals_total > 20
+        OR other_metrics_total < 0 OR other_metrics_total > 10`)
   };
 });
 